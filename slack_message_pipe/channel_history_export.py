@@ -6,9 +6,12 @@
 
 import datetime as dt
 import logging
+from functools import lru_cache
+from operator import itemgetter
 from pprint import pformat
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
+from slack_message_pipe.helpers import iter_in_background
 from slack_message_pipe.intermediate_data import (
     UNKNOWN_USER,
     ActionsBlock,
@@ -50,6 +53,37 @@ from slack_message_pipe.slack_text_converter import SlackTextConverter
 
 logger = logging.getLogger(__name__)
 
+_get_ts_and_text = itemgetter("ts", "text")
+
+# How many pages of messages the background fetch may get ahead of formatting.
+_MAX_PREFETCHED_PAGES = 4
+
+
+def _debug_dump(owner: object, label: str, obj: Any) -> None:
+    """Logs a pformat dump of obj at DEBUG level, prefixed with owner's class name and label.
+
+    pformat is expensive, so nothing is built unless DEBUG logging is enabled.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"{owner.__class__.__name__}.{label}")
+        logger.debug(pformat(obj))
+
+
+@lru_cache(maxsize=4096)
+def _slack_ts_to_display(ts: str) -> str:
+    """Converts a Slack timestamp string to a human-readable format in GMT.
+
+    Cached because the same timestamps recur, e.g. a thread's thread_ts on every reply.
+    """
+    # Always display as UTC because the resulting data should be user-independent.
+    # The f-string produces the same text as strftime("%Y-%m-%d %H:%M:%S %Z"),
+    # without strftime parsing its format string on every call.
+    d = dt.datetime.fromtimestamp(float(ts), tz=dt.timezone.utc)
+    return (
+        f"{d.year:04d}-{d.month:02d}-{d.day:02d} "
+        f"{d.hour:02d}:{d.minute:02d}:{d.second:02d} UTC"
+    )
+
 
 class ChannelHistoryExporter:
     """Class for fetching and formatting data from Slack API into intermediate data structures."""
@@ -62,7 +96,25 @@ class ChannelHistoryExporter:
     ):
         self._slack_service = slack_service
         self._locale_helper = locale_helper
+        self._timezone = locale_helper.timezone
         self._slack_text_converter = slack_text_converter
+        # Bound once here because _format_message runs for every message.
+        self._convert_slack_text = slack_text_converter.convert_slack_text
+        self._user_data = slack_service.user_data()
+        self._rich_text_element_formatters: dict[
+            str, Callable[[dict[str, Any]], RichTextElement]
+        ] = {
+            "rich_text_section": self._format_rich_text_section_element,
+            "rich_text_list": self._format_rich_text_list_element,
+            "rich_text_preformatted": self._format_rich_text_preformatted_element,
+            "rich_text_quote": self._format_rich_text_quote_element,
+            "text": self._format_rich_text_text_element,
+            "channel": self._format_rich_text_channel_element,
+            "user": self._format_rich_text_user_element,
+            "user_group": self._format_rich_text_user_group_element,
+            "emoji": self._format_rich_text_emoji_element,
+            "link": self._format_rich_text_link_element,
+        }
 
     def fetch_and_format_channel_data(
         self,
@@ -78,30 +130,43 @@ class ChannelHistoryExporter:
             f"{self.__class__.__name__}.fetch_and_format_channel_data: Processing channel {channel_id}"
         )
         try:
-            top_level_slack_messages = self._slack_service.fetch_messages_from_channel(
-                channel_id, max_messages, oldest, latest
-            )
-            threads_by_ts = self._slack_service.fetch_threads_by_ts(
-                channel_id, top_level_slack_messages, max_messages, oldest, latest
+            self._user_data = self._slack_service.user_data()
+            # Format messages as the pages arrive, so that no raw Slack data is kept
+            # around; fetching the threads only needs their parents' timestamps.
+            # The pages are fetched on a background thread, so formatting overlaps
+            # with waiting for the next page.
+            top_level_messages = []
+            thread_ts_list = []
+            for page in iter_in_background(
+                self._slack_service.iter_message_pages_from_channel(
+                    channel_id, max_messages, oldest, latest
+                ),
+                max_prefetched=_MAX_PREFETCHED_PAGES,
+            ):
+                for sm in page:
+                    top_level_messages.append(self._format_message(sm))
+                    if sm.get("thread_ts") == sm["ts"]:
+                        thread_ts_list.append(sm["ts"])
+            threads_by_ts = self._slack_service.fetch_threads(
+                channel_id, thread_ts_list, max_messages, oldest, latest
             )
 
             # Reverse the order of top-level messages to be in chronological order
-            top_level_slack_messages.reverse()
+            top_level_messages.reverse()
 
-            top_level_messages = [
-                self._format_message(sm) for sm in top_level_slack_messages
-            ]
             parent_messages_by_ts = {msg.ts: msg for msg in top_level_messages}
 
             for thread_ts, thread_messages in threads_by_ts.items():
                 parent_message = parent_messages_by_ts.get(thread_ts)
-                if parent_message:
-                    # Reverse the order of thread messages to be in chronological order
-                    thread_messages.reverse()
-                    for reply_slack_message in thread_messages:
-                        if reply_slack_message["ts"] != thread_ts:
-                            reply_message = self._format_message(reply_slack_message)
-                            parent_message.replies.append(reply_message)
+                if not parent_message:
+                    continue
+                # Reverse the order of thread messages to be in chronological order
+                thread_messages.reverse()
+                parent_message.replies.extend(
+                    self._format_message(reply_slack_message)
+                    for reply_slack_message in thread_messages
+                    if reply_slack_message["ts"] != thread_ts
+                )
 
             channel_name = self._slack_service.channel_names().get(
                 channel_id, f"channel_{channel_id}"
@@ -118,51 +183,29 @@ class ChannelHistoryExporter:
     def _format_message(self, msg: SlackMessage) -> Message:
         """Formats a message from Slack API data into a Message data class."""
         try:
-            logger.debug(
-                f"{self.__class__.__name__}._format_message: Slack API data received:"
-            )
-            logger.debug(pformat(msg))
+            _debug_dump(self, "_format_message: Slack API data received:", msg)
 
+            get = msg.get
+            ts, text = _get_ts_and_text(msg)
             user: Optional[User] = None
-            user_id = msg.get("user") or msg.get("bot_id")
+            user_id = get("user") or get("bot_id")
             if user_id:
-                slack_user = self._slack_service.user_data().get(user_id)
+                slack_user = self._user_data.get(user_id)
                 if slack_user:
-                    user = User(
-                        id=user_id,
+                    user = User.get_or_create(
+                        user_id=user_id,
                         name=slack_user.name,
                         real_name=slack_user.real_name,
                         is_bot=slack_user.is_bot,
                     )
 
-            ts = msg["ts"]
-            thread_ts = msg.get("thread_ts")
+            thread_ts = get("thread_ts")
             ts_display = self._format_slack_ts_for_display(ts)
             thread_ts_display = (
                 self._format_slack_ts_for_display(thread_ts) if thread_ts else None
             )
-            is_markdown = msg.get("mrkdwn", True)
-            markdown = self._slack_text_converter.convert_slack_text(
-                msg["text"], is_markdown=is_markdown
-            )
-            reactions = [
-                self._format_reaction(reaction) for reaction in msg.get("reactions", [])
-            ]
-
-            files = []
-            for slack_file in msg.get("files", []):
-                formatted_file = self._format_file(slack_file)
-                if formatted_file:
-                    files.append(formatted_file)
-
-            attachments = []
-            for slack_attachment in msg.get("attachments", []):
-                formatted_attachment = self._format_attachment(slack_attachment)
-                if formatted_attachment:
-                    attachments.append(formatted_attachment)
-
-            blocks = [self._format_block(block) for block in msg.get("blocks", [])]
-
+            is_markdown = get("mrkdwn", True)
+            markdown = self._convert_slack_text(text, is_markdown=is_markdown)
             formatted_message = Message(
                 user=user,
                 ts=ts,
@@ -170,17 +213,20 @@ class ChannelHistoryExporter:
                 ts_display=ts_display,
                 thread_ts_display=thread_ts_display,
                 markdown=markdown,
-                reactions=reactions,
-                files=files,
-                attachments=attachments,
-                blocks=blocks,
                 is_bot="bot_id" in msg,
             )
+            # Plain messages carry none of these keys and keep the empty defaults.
+            if (
+                "reactions" in msg
+                or "files" in msg
+                or "attachments" in msg
+                or "blocks" in msg
+            ):
+                self._add_message_payload(formatted_message, msg)
 
-            logger.debug(
-                f"{self.__class__.__name__}._format_message: Intermediate data produced:"
+            _debug_dump(
+                self, "_format_message: Intermediate data produced:", formatted_message
             )
-            logger.debug(pformat(formatted_message))
 
             return formatted_message
         except Exception:
@@ -203,10 +249,7 @@ class ChannelHistoryExporter:
     def _format_slack_ts_for_display(self, ts: str) -> str:
         """Converts a Slack timestamp string to a human-readable format in GMT."""
         try:
-            # Always display as UTC because the resulting data should be user-independent.
-            dt_obj = dt.datetime.fromtimestamp(float(ts), tz=dt.timezone.utc)
-            formatted_ts = dt_obj.strftime("%Y-%m-%d %H:%M:%S %Z")
-            return formatted_ts
+            return _slack_ts_to_display(ts)
         except Exception:
             logger.warning(
                 f"Failed to convert Slack timestamp {ts} to display format.",
@@ -215,13 +258,37 @@ class ChannelHistoryExporter:
             # Return a placeholder or the original timestamp in case of failure
             return "Invalid Timestamp"
 
+    def _add_message_payload(self, message: Message, msg: SlackMessage) -> None:
+        """Fills in the reactions, files, attachments and blocks of a formatted message."""
+        slack_reactions = msg.get("reactions")
+        if slack_reactions:
+            message.reactions = [
+                self._format_reaction(reaction) for reaction in slack_reactions
+            ]
+        slack_files = msg.get("files")
+        if slack_files:
+            message.files = [
+                formatted_file
+                for formatted_file in map(self._format_file, slack_files)
+                if formatted_file
+            ]
+        slack_attachments = msg.get("attachments")
+        if slack_attachments:
+            message.attachments = [
+                formatted_attachment
+                for formatted_attachment in map(
+                    self._format_attachment, slack_attachments
+                )
+                if formatted_attachment
+            ]
+        slack_blocks = msg.get("blocks")
+        if slack_blocks:
+            message.blocks = [self._format_block(block) for block in slack_blocks]
+
     def _format_reaction(self, reaction: dict[str, Any]) -> Reaction:
         """Formats a reaction from Slack API data into a Reaction data class."""
         try:
-            logger.debug(
-                f"{self.__class__.__name__}._format_reaction: Slack API data received:"
-            )
-            logger.debug(pformat(reaction))
+            _debug_dump(self, "_format_reaction: Slack API data received:", reaction)
 
             formatted_reaction = Reaction(
                 name=reaction["name"],
@@ -229,10 +296,11 @@ class ChannelHistoryExporter:
                 user_ids=reaction["users"],
             )
 
-            logger.debug(
-                f"{self.__class__.__name__}._format_reaction: Intermediate data produced:"
+            _debug_dump(
+                self,
+                "_format_reaction: Intermediate data produced:",
+                formatted_reaction,
             )
-            logger.debug(pformat(formatted_reaction))
 
             return formatted_reaction
         except Exception:
@@ -245,10 +313,7 @@ class ChannelHistoryExporter:
     def _format_file(self, file: dict[str, Any]) -> Optional[File]:
         """Formats a file from Slack API data into a File data class."""
         try:
-            logger.debug(
-                f"{self.__class__.__name__}._format_file: Slack API data received:"
-            )
-            logger.debug(pformat(file))
+            _debug_dump(self, "_format_file: Slack API data received:", file)
 
             url = file.get("url_private") or None
             name = file.get("name")
@@ -265,7 +330,7 @@ class ChannelHistoryExporter:
                     size=file.get("size", 0),
                     timestamp=(
                         dt.datetime.fromtimestamp(
-                            float(file["timestamp"]), tz=self._locale_helper.timezone
+                            float(file["timestamp"]), tz=self._timezone
                         )
                         if "timestamp" in file
                         else None
@@ -275,10 +340,9 @@ class ChannelHistoryExporter:
                 else None
             )
 
-            logger.debug(
-                f"{self.__class__.__name__}._format_file: Intermediate data produced:"
+            _debug_dump(
+                self, "_format_file: Intermediate data produced:", formatted_file
             )
-            logger.debug(pformat(formatted_file))
 
             return formatted_file
         except Exception:
@@ -288,10 +352,9 @@ class ChannelHistoryExporter:
     def _format_attachment(self, attachment: dict[str, Any]) -> Optional[Attachment]:
         """Formats an attachment from Slack API data into an Attachment data class."""
         try:
-            logger.debug(
-                f"{self.__class__.__name__}._format_attachment: Slack API data received:"
+            _debug_dump(
+                self, "_format_attachment: Slack API data received:", attachment
             )
-            logger.debug(pformat(attachment))
 
             # Process blocks for structured data
             blocks = []
@@ -334,10 +397,11 @@ class ChannelHistoryExporter:
                 blocks=blocks,
             )
 
-            logger.debug(
-                f"{self.__class__.__name__}._format_attachment: Intermediate data produced:"
+            _debug_dump(
+                self,
+                "_format_attachment: Intermediate data produced:",
+                formatted_attachment,
             )
-            logger.debug(pformat(formatted_attachment))
             return formatted_attachment
         except Exception:
             logger.warning(
@@ -348,10 +412,7 @@ class ChannelHistoryExporter:
     def _format_block(self, block: dict[str, Any]) -> Block:
         """Formats a block from Slack API data into a Block data class."""
         try:
-            logger.debug(
-                f"{self.__class__.__name__}._format_block: Slack API data received:"
-            )
-            logger.debug(pformat(block))
+            _debug_dump(self, "_format_block: Slack API data received:", block)
 
             block_type = block["type"]
             formatted_block: Block
@@ -372,10 +433,9 @@ class ChannelHistoryExporter:
                 # Fallback to a generic Block with minimal information
                 formatted_block = Block(type=block_type)
 
-            logger.debug(
-                f"{self.__class__.__name__}._format_block: Intermediate data produced:"
+            _debug_dump(
+                self, "_format_block: Intermediate data produced:", formatted_block
             )
-            logger.debug(pformat(formatted_block))
 
             return formatted_block
         except Exception:
@@ -386,10 +446,7 @@ class ChannelHistoryExporter:
     def _format_section_block(self, block: dict[str, Any]) -> SectionBlock:
         """Formats a section block from Slack API data."""
         try:
-            logger.debug(
-                f"{self.__class__.__name__}._format_section_block: Slack API data received:"
-            )
-            logger.debug(pformat(block))
+            _debug_dump(self, "_format_section_block: Slack API data received:", block)
 
             text = None
             if "text" in block:
@@ -397,12 +454,10 @@ class ChannelHistoryExporter:
                     type=block["text"]["type"], text=block["text"]["text"]
                 )
 
-            fields = None
-            if "fields" in block:
-                fields = [
-                    Composition(type=f["type"], text=f["text"])
-                    for f in block.get("fields", [])
-                ]
+            fields = tuple(
+                Composition(type=f["type"], text=f["text"])
+                for f in block.get("fields", ())
+            )
 
             accessory = None
             if "accessory" in block:
@@ -412,32 +467,31 @@ class ChannelHistoryExporter:
                 type="section", text=text, fields=fields, accessory=accessory
             )
 
-            logger.debug(
-                f"{self.__class__.__name__}._format_section_block: Intermediate data produced:"
+            _debug_dump(
+                self,
+                "_format_section_block: Intermediate data produced:",
+                section_block,
             )
-            logger.debug(pformat(section_block))
 
             return section_block
         except Exception:
             logger.warning(
                 "Failed to format section block from Slack API data.", exc_info=True
             )
-            return SectionBlock(type="section", text=None, fields=None, accessory=None)
+            return SectionBlock(type="section", text=None, accessory=None)
 
     def _format_divider_block(self, block: dict[str, Any]) -> DividerBlock:
         """Formats a divider block from Slack API data."""
         try:
-            logger.debug(
-                f"{self.__class__.__name__}._format_divider_block: Slack API data received:"
-            )
-            logger.debug(pformat(block))
+            _debug_dump(self, "_format_divider_block: Slack API data received:", block)
 
             divider_block = DividerBlock(type="divider")
 
-            logger.debug(
-                f"{self.__class__.__name__}._format_divider_block: Intermediate data produced:"
+            _debug_dump(
+                self,
+                "_format_divider_block: Intermediate data produced:",
+                divider_block,
             )
-            logger.debug(pformat(divider_block))
 
             return divider_block
         except Exception:
@@ -449,10 +503,7 @@ class ChannelHistoryExporter:
     def _format_image_block(self, block: dict[str, Any]) -> ImageBlock:
         """Formats an image block from Slack API data."""
         try:
-            logger.debug(
-                f"{self.__class__.__name__}._format_image_block: Slack API data received:"
-            )
-            logger.debug(pformat(block))
+            _debug_dump(self, "_format_image_block: Slack API data received:", block)
 
             image_url = block["image_url"]
             alt_text = block["alt_text"]
@@ -466,10 +517,9 @@ class ChannelHistoryExporter:
                 type="image", image_url=image_url, alt_text=alt_text, title=title
             )
 
-            logger.debug(
-                f"{self.__class__.__name__}._format_image_block: Intermediate data produced:"
+            _debug_dump(
+                self, "_format_image_block: Intermediate data produced:", image_block
             )
-            logger.debug(pformat(image_block))
 
             return image_block
         except Exception:
@@ -481,19 +531,17 @@ class ChannelHistoryExporter:
     def _format_actions_block(self, block: dict[str, Any]) -> ActionsBlock:
         """Formats an actions block from Slack API data."""
         try:
-            logger.debug(
-                f"{self.__class__.__name__}._format_actions_block: Slack API data received:"
-            )
-            logger.debug(pformat(block))
+            _debug_dump(self, "_format_actions_block: Slack API data received:", block)
 
             elements = [self._format_element(el) for el in block.get("elements", [])]
 
             actions_block = ActionsBlock(type="actions", elements=elements)
 
-            logger.debug(
-                f"{self.__class__.__name__}._format_actions_block: Intermediate data produced:"
+            _debug_dump(
+                self,
+                "_format_actions_block: Intermediate data produced:",
+                actions_block,
             )
-            logger.debug(pformat(actions_block))
 
             return actions_block
         except Exception:
@@ -505,19 +553,17 @@ class ChannelHistoryExporter:
     def _format_context_block(self, block: dict[str, Any]) -> ContextBlock:
         """Formats a context block from Slack API data."""
         try:
-            logger.debug(
-                f"{self.__class__.__name__}._format_context_block: Slack API data received:"
-            )
-            logger.debug(pformat(block))
+            _debug_dump(self, "_format_context_block: Slack API data received:", block)
 
             elements = [self._format_element(el) for el in block.get("elements", [])]
 
             context_block = ContextBlock(type="context", elements=elements)
 
-            logger.debug(
-                f"{self.__class__.__name__}._format_context_block: Intermediate data produced:"
+            _debug_dump(
+                self,
+                "_format_context_block: Intermediate data produced:",
+                context_block,
             )
-            logger.debug(pformat(context_block))
 
             return context_block
         except Exception:
@@ -529,10 +575,9 @@ class ChannelHistoryExporter:
     def _format_rich_text_block(self, block: dict[str, Any]) -> RichTextBlock:
         """Formats a rich text block from Slack API data."""
         try:
-            logger.debug(
-                f"{self.__class__.__name__}._format_rich_text_block: Slack API data received:"
+            _debug_dump(
+                self, "_format_rich_text_block: Slack API data received:", block
             )
-            logger.debug(pformat(block))
 
             elements = [
                 self._format_rich_text_element(el) for el in block.get("elements", [])
@@ -540,10 +585,11 @@ class ChannelHistoryExporter:
 
             rich_text_block = RichTextBlock(type="rich_text", elements=elements)
 
-            logger.debug(
-                f"{self.__class__.__name__}._format_rich_text_block: Intermediate data produced:"
+            _debug_dump(
+                self,
+                "_format_rich_text_block: Intermediate data produced:",
+                rich_text_block,
             )
-            logger.debug(pformat(rich_text_block))
 
             return rich_text_block
         except Exception:
@@ -555,10 +601,7 @@ class ChannelHistoryExporter:
     def _format_element(self, element: dict[str, Any]) -> Element:
         """Formats an element from Slack API data into an appropriate Element subclass."""
         try:
-            logger.debug(
-                f"{self.__class__.__name__}._format_element: Slack API data received:"
-            )
-            logger.debug(pformat(element))
+            _debug_dump(self, "_format_element: Slack API data received:", element)
 
             element_type = element["type"]
             formatted_element: Element
@@ -575,10 +618,9 @@ class ChannelHistoryExporter:
                     type=element_type
                 )  # Placeholder for unsupported element types
 
-            logger.debug(
-                f"{self.__class__.__name__}._format_element: Intermediate data produced:"
+            _debug_dump(
+                self, "_format_element: Intermediate data produced:", formatted_element
             )
-            logger.debug(pformat(formatted_element))
 
             return formatted_element
         except Exception:
@@ -654,39 +696,20 @@ class ChannelHistoryExporter:
     def _format_rich_text_element(self, element: dict[str, Any]) -> RichTextElement:
         """Formats a rich text element from Slack API data into a RichTextElement data class."""
         try:
-            logger.debug(
-                f"{self.__class__.__name__}._format_rich_text_element: Slack API data received:"
+            _debug_dump(
+                self, "_format_rich_text_element: Slack API data received:", element
             )
-            logger.debug(pformat(element))
 
             element_type = element["type"]
-            if element_type == "rich_text_section":
-                return self._format_rich_text_section_element(element)
-            elif element_type == "rich_text_list":
-                return self._format_rich_text_list_element(element)
-            elif element_type == "rich_text_preformatted":
-                return self._format_rich_text_preformatted_element(element)
-            elif element_type == "rich_text_quote":
-                return self._format_rich_text_quote_element(element)
-            elif element_type == "text":
-                return self._format_rich_text_text_element(element)
-            elif element_type == "channel":
-                return self._format_rich_text_channel_element(element)
-            elif element_type == "user":
-                return self._format_rich_text_user_element(element)
-            elif element_type == "user_group":
-                return self._format_rich_text_user_group_element(element)
-            elif element_type == "emoji":
-                return self._format_rich_text_emoji_element(element)
-            elif element_type == "link":
-                return self._format_rich_text_link_element(element)
-            else:
+            formatter = self._rich_text_element_formatters.get(element_type)
+            if formatter is None:
                 logger.warning(
                     f"Unsupported rich text element type encountered: {element_type}"
                 )
                 return RichTextElement(
                     type=element_type
                 )  # Fallback for unsupported types
+            return formatter(element)
         except Exception:
             logger.warning(
                 "Failed to format rich text element from Slack API data.", exc_info=True
@@ -813,10 +836,11 @@ class ChannelHistoryExporter:
     ) -> RichTextTextElement:
         """Formats a rich text text element from Slack API data."""
         try:
-            logger.debug(
-                f"{self.__class__.__name__}._format_rich_text_text_element: Slack API data received:"
+            _debug_dump(
+                self,
+                "_format_rich_text_text_element: Slack API data received:",
+                element,
             )
-            logger.debug(pformat(element))
 
             text = element.get("text", "")
             style = (
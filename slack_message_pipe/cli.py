@@ -6,14 +6,18 @@
 # Copyright (c) 2024 Dean Thompson
 
 import argparse
+import asyncio
+import dataclasses
 import datetime as dt
+import json
 import logging
 import logging.config
 import os
+import re
 import sys
 import zoneinfo
+from functools import lru_cache
 from pathlib import Path
-from pprint import pformat
 from typing import Optional
 
 import dateutil.parser
@@ -26,14 +30,52 @@ from slack_message_pipe import __version__, settings
 
 # Import the new SlackDataFormatter
 from slack_message_pipe.channel_history_export import ChannelHistoryExporter
-from slack_message_pipe.format_as_markdown import Config, format_as_markdown
+from slack_message_pipe.format_as_markdown import Config, write_as_markdown
 from slack_message_pipe.intermediate_data import ChannelHistory
 from slack_message_pipe.locales import LocaleHelper
-from slack_message_pipe.slack_service import SlackService
+from slack_message_pipe.slack_service import DEFAULT_NAME_CACHE_DIR, SlackService
 from slack_message_pipe.slack_text_converter import SlackTextConverter
 
 logging.config.dictConfig(settings.DEFAULT_LOGGING)
 
+# Date-time formats we expect on the command line, tried in order before falling back
+# to the much slower general-purpose dateutil parser.
+_CLI_DATETIME_FORMATS = (
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+)
+
+# Trailing CLI date-time tokens that are certainly timezones: "Z", UTC/GMT, anything starting
+# with a sign (a numeric offset, validated with _OFFSET_RE), and tz database names such as
+# "Europe/Berlin".
+_TZ_TOKEN_RE = re.compile(r"Z|UTC|GMT|[+-]\S*|[A-Za-z_]+(?:/[A-Za-z0-9_+-]+)+")
+# Numeric UTC offsets such as "+05:30", "-0800", "+05" or "-5".
+_OFFSET_RE = re.compile(r"([+-])(\d{1,2})(?::?(\d{2}))?")
+# Trailing tokens that might be a timezone abbreviation such as "EST"; these are checked with gettz.
+_TZ_ABBREVIATION_RE = re.compile(r"[A-Za-z][A-Za-z0-9_+-]*")
+
+# Buffer size for output files, so that streamed chunks are written in large blocks.
+_OUTPUT_BUFFER_SIZE = 1 << 20
+
+
+@lru_cache(maxsize=256)
+def _cached_gettz(name: str) -> Optional[dt.tzinfo]:
+    """Returns dateutil's tzinfo for the given name, caching the lookup."""
+    return gettz(name)
+
+
+@lru_cache(maxsize=None)
+def _cached_localzone() -> Optional[dt.tzinfo]:
+    """Returns this process's local timezone, looking it up only once."""
+    return get_localzone()
+
+
+@lru_cache(maxsize=256)
+def _cached_zoneinfo(name: str) -> zoneinfo.ZoneInfo:
+    """Returns the ZoneInfo for the given name, caching the lookup."""
+    return zoneinfo.ZoneInfo(name)
+
 
 def main():
     """Implements the arg parser and starts the data formatting with its input"""
@@ -44,61 +86,102 @@ def main():
     formatter_locale = _parse_formatter_locale(args)
     oldest = _parse_datetime_argument(args.oldest)
     latest = _parse_datetime_argument(args.latest)
+    locale_helper = LocaleHelper(formatter_locale, formatter_timezone)
 
     try:
         slack_service = SlackService(
             slack_token=slack_token,
-            locale_helper=LocaleHelper(formatter_locale, formatter_timezone),
+            locale_helper=locale_helper,
+            name_cache_dir=DEFAULT_NAME_CACHE_DIR,
+            refresh_name_cache=args.refresh_cache,
         )
         message_to_markdown = SlackTextConverter(
             slack_service=slack_service,
-            locale_helper=LocaleHelper(formatter_locale, formatter_timezone),
+            locale_helper=locale_helper,
         )
         if not args.quiet:
             print("Pulling metadata such as user and channel names from Slack...")
         exporter = ChannelHistoryExporter(
             slack_service=slack_service,
-            locale_helper=LocaleHelper(formatter_locale, formatter_timezone),
+            locale_helper=locale_helper,
             slack_text_converter=message_to_markdown,
         )
     except SlackApiError as ex:
         print(f"ERROR: {ex}")
         sys.exit(1)
 
-    output_file_extension = "md" if args.command == "markdown" else "txt"
-    for channel_id in args.channel_id:
-        if not args.quiet:
-            print(f"Exporting history from channel {channel_id}...")
-        channel_history = exporter.fetch_and_format_channel_data(
-            channel_id=channel_id,
-            oldest=oldest,
-            latest=latest,
-            max_messages=args.max_messages,
-        )
-        datetime_format = "%Y%m%d_%H%M"
-        oldest_str = oldest.strftime(datetime_format)
-        latest_str = latest.strftime(datetime_format)
-        output_path = Path(
-            f"{channel_history.channel.name}_{oldest_str}_to_{latest_str}.{output_file_extension}"
-        )
-        try:
-            if args.command == "pprint":
-                pretty_print(channel_history, output_path)
-            elif args.command == "markdown":
-                markdown_output = format_as_markdown(
-                    channel_history, Config(images=args.images)
-                )
-                with open(output_path, "w", encoding="utf-8") as f:
-                    f.write(markdown_output)
-            else:
-                print(f"ERROR: Unknown command '{args.command}'")
-                sys.exit(1)
-        except IOError as e:
-            print(f"ERROR: Failed to write to {output_path}: {e}")
-            continue
+    asyncio.run(_export_channels(exporter, args, oldest, latest))
 
-        if not args.quiet:
-            print(f"Wrote data for channel {channel_id} to {output_path}")
+
+async def _export_channels(
+    exporter: ChannelHistoryExporter,
+    args: argparse.Namespace,
+    oldest: dt.datetime,
+    latest: dt.datetime,
+) -> None:
+    """
+    Exports all channels named on the command line, running up to
+    settings.MAX_CONCURRENT_CHANNELS exports at a time in worker threads.
+
+    Exporting a channel is dominated by waiting on Slack API round trips, so overlapping
+    several channels shortens the total run time.
+    """
+    semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_CHANNELS)
+
+    async def export_with_limit(channel_id: str) -> None:
+        async with semaphore:
+            await asyncio.to_thread(
+                _export_channel, exporter, channel_id, args, oldest, latest
+            )
+
+    await asyncio.gather(
+        *(export_with_limit(channel_id) for channel_id in args.channel_id)
+    )
+
+
+def _export_channel(
+    exporter: ChannelHistoryExporter,
+    channel_id: str,
+    args: argparse.Namespace,
+    oldest: dt.datetime,
+    latest: dt.datetime,
+) -> None:
+    """Fetches the history of one channel and writes it to a file in the requested format."""
+    if not args.quiet:
+        print(f"Exporting history from channel {channel_id}...")
+    channel_history = exporter.fetch_and_format_channel_data(
+        channel_id=channel_id,
+        oldest=oldest,
+        latest=latest,
+        max_messages=args.max_messages,
+    )
+    output_file_extension = "md" if args.command == "markdown" else "json"
+    datetime_format = "%Y%m%d_%H%M"
+    oldest_str = oldest.strftime(datetime_format)
+    latest_str = latest.strftime(datetime_format)
+    output_path = Path(
+        f"{channel_history.channel.name}_{oldest_str}_to_{latest_str}.{output_file_extension}"
+    )
+    try:
+        if args.command == "pprint":
+            pretty_print(channel_history, output_path)
+        elif args.command == "markdown":
+            with open(
+                output_path,
+                "w",
+                encoding="utf-8",
+                buffering=_OUTPUT_BUFFER_SIZE,
+            ) as f:
+                write_as_markdown(channel_history, Config(images=args.images), f)
+        else:
+            print(f"ERROR: Unknown command '{args.command}'")
+            sys.exit(1)
+    except IOError as e:
+        print(f"ERROR: Failed to write to {output_path}: {e}")
+        return
+
+    if not args.quiet:
+        print(f"Wrote data for channel {channel_id} to {output_path}")
 
 
 def _parse_args(args: list[str]) -> argparse.Namespace:
@@ -192,6 +275,12 @@ def _parse_args(args: list[str]) -> argparse.Namespace:
         default=settings.MAX_MESSAGES_PER_CHANNEL,
     )
 
+    my_arg_parser.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        help="Fetch user, channel and usergroup names from Slack even if they are cached",
+    )
+
     my_arg_parser.add_argument(
         "--quiet",
         action="store_const",
@@ -241,7 +330,7 @@ def _parse_formatter_timezone(args: argparse.Namespace) -> Optional[zoneinfo.Zon
     """
     if args.formatter_timezone is not None:
         try:
-            tz = zoneinfo.ZoneInfo(args.formatter_timezone)
+            tz = _cached_zoneinfo(args.formatter_timezone)
         except ValueError:
             print("ERROR: Unknown timezone")
             sys.exit(1)
@@ -304,7 +393,7 @@ def _parse_datetime_argument(
         return dt.datetime.now(tz=process_timezone)
 
     if process_timezone is None:
-        process_timezone = get_localzone()
+        process_timezone = _cached_localzone()
         if process_timezone is None:
             raise ValueError(
                 "No timezone specified and the process timezone is not known."
@@ -315,11 +404,9 @@ def _parse_datetime_argument(
     datetime_parts = cli_datetime_str.rsplit(" ", 1)
     if len(datetime_parts) == 2:
         possible_timezone_str = datetime_parts[1]
-        if (
-            possible_timezone_str == "Z"
-            or "+" in possible_timezone_str
-            or "-" in possible_timezone_str
-            or gettz(possible_timezone_str)
+        if _TZ_TOKEN_RE.fullmatch(possible_timezone_str) or (
+            _TZ_ABBREVIATION_RE.fullmatch(possible_timezone_str)
+            and _cached_gettz(possible_timezone_str)
         ):
             timezone_str = possible_timezone_str
             cli_datetime_str = datetime_parts[0]
@@ -330,29 +417,83 @@ def _parse_datetime_argument(
 
     # Parse the date-time without timezone information
     try:
-        datetime_obj = dateutil.parser.parse(cli_datetime_str)
+        datetime_obj = _fast_parse(cli_datetime_str)
     except ValueError as e:
         raise ValueError(f"Invalid date-time format: {cli_datetime_str}") from e
 
     # Apply timezone information
     if timezone_str:
-        if timezone_str == "Z":
-            timezone_str = "UTC"
-        timezone = gettz(timezone_str)
-        if timezone:
-            datetime_obj = datetime_obj.replace(tzinfo=timezone)
-        else:
-            raise ValueError(f"Invalid timezone: {timezone_str}")
-    else:
+        timezone = _resolve_timezone(timezone_str)
+        if datetime_obj.tzinfo is not None:
+            raise ValueError(
+                f"Conflicting timezones in date-time: {cli_datetime_str} {timezone_str}"
+            )
+        datetime_obj = datetime_obj.replace(tzinfo=timezone)
+    elif datetime_obj.tzinfo is None:
         # Apply the process timezone if no timezone is specified in the input
         datetime_obj = datetime_obj.replace(tzinfo=process_timezone)
 
     return datetime_obj
 
 
+def _resolve_timezone(timezone_str: str) -> dt.tzinfo:
+    """
+    Resolves a timezone token from a CLI date-time: "Z", a numeric UTC offset, or a timezone name.
+
+    Raises:
+        ValueError: If the token does not name a valid timezone.
+    """
+    timezone: Optional[dt.tzinfo]
+    if timezone_str == "Z":
+        timezone = _cached_gettz("UTC")
+    elif timezone_str.startswith(("+", "-")):
+        offset_match = _OFFSET_RE.fullmatch(timezone_str)
+        timezone = (
+            _fixed_offset_timezone(*offset_match.groups()) if offset_match else None
+        )
+    else:
+        timezone = _cached_gettz(timezone_str)
+    if not timezone:
+        raise ValueError(f"Invalid timezone: {timezone_str}")
+    return timezone
+
+
+def _fixed_offset_timezone(
+    sign: str, hours: str, minutes: Optional[str]
+) -> Optional[dt.timezone]:
+    """Returns a fixed-offset timezone for the parts of a numeric UTC offset, or None if it is out of range."""
+    offset = dt.timedelta(hours=int(hours), minutes=int(minutes or 0))
+    try:
+        return dt.timezone(-offset if sign == "-" else offset)
+    except ValueError:
+        return None
+
+
+def _fast_parse(datetime_str: str) -> dt.datetime:
+    """
+    Parses a date-time string without timezone information.
+
+    Tries the formats in _CLI_DATETIME_FORMATS with strptime first, and only falls back to
+    dateutil.parser.parse if none of them match.
+
+    Raises:
+        ValueError: If the string cannot be parsed as a date-time.
+    """
+    for datetime_format in _CLI_DATETIME_FORMATS:
+        try:
+            return dt.datetime.strptime(datetime_str, datetime_format)
+        except ValueError:
+            pass
+    return dateutil.parser.parse(datetime_str)
+
+
 def pretty_print(formatted_data: ChannelHistory, dest_path: Path) -> None:
     """
-    Pretty-prints the Python intermediate data structures to a file.
+    Pretty-prints the Python intermediate data structures to a file as indented JSON.
+
+    json.dump writes the encoded data to the file incrementally, so the output is never
+    held as one large string. Values that JSON cannot represent, such as datetimes, are
+    written as their str().
 
     Args:
         formatted_data: The data structure containing the channel history to be printed.
@@ -361,8 +502,14 @@ def pretty_print(formatted_data: ChannelHistory, dest_path: Path) -> None:
     Raises:
         IOError: If an error occurs during file writing.
     """
-    with open(dest_path, "w", encoding="utf-8") as f:
-        f.write(pformat(formatted_data))
+    with open(dest_path, "w", encoding="utf-8", buffering=_OUTPUT_BUFFER_SIZE) as f:
+        json.dump(
+            dataclasses.asdict(formatted_data),
+            f,
+            indent=2,
+            ensure_ascii=False,
+            default=str,
+        )
         f.write("\n")
 
 
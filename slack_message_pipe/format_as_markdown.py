@@ -5,7 +5,8 @@
 # Copyright (c) 2024 Dean Thompson
 
 from dataclasses import dataclass
-from typing import Optional
+from functools import lru_cache
+from typing import TextIO
 
 from slack_message_pipe.intermediate_data import (
     UNKNOWN_USER,
@@ -18,6 +19,10 @@ from slack_message_pipe.intermediate_data import (
 # Throughout this file, whenever a function formats something that should be its own paragraph,
 # it includes two trailing new lines.
 
+# Markdown only has six heading levels, so deeper levels are rendered as level 6.
+_MAX_HEADING_LEVEL = 6
+_HEADING_PREFIXES = tuple("#" * level for level in range(_MAX_HEADING_LEVEL + 1))
+
 
 @dataclass
 class Config:
@@ -29,104 +34,128 @@ class Config:
 def format_as_markdown(history: ChannelHistory, config: Config) -> str:
     """Converts a ChannelHistory object into human-readable Markdown with
     hierarchical threads."""
+    parts = [f"# {history.channel.name}\n\n"]
+
+    for message in history.top_level_messages:
+        # Heading level 2 for top-level messages
+        format_message(parts, message, 2, config=config)
+
+    return "".join(parts)
 
-    output = f"# {history.channel.name}\n\n"
 
+def write_as_markdown(history: ChannelHistory, config: Config, out: TextIO) -> None:
+    """Writes a ChannelHistory object to `out` as human-readable Markdown with
+    hierarchical threads, one top-level message (and its thread) at a time."""
+    out.write(f"# {history.channel.name}\n\n")
+
+    parts: list[str] = []
     for message in history.top_level_messages:
         # Heading level 2 for top-level messages
-        output += format_message(message, 2, config=config)
+        format_message(parts, message, 2, config=config)
+        out.writelines(parts)
+        parts.clear()
 
-    return output
 
+def format_message(
+    parts: list[str], message: Message, heading_level: int, config: Config
+) -> None:
+    """Appends a Message object and its thread of replies to `parts` as human-readable Markdown.
 
-def format_message(message: Message, heading_level: int, config: Config) -> str:
-    """Formats a Message object into human-readable Markdown, including a header."""
+    Replies are walked depth-first with an explicit stack rather than by recursion, so deep
+    threads neither pay per-call overhead nor run into the interpreter's recursion limit.
+    Each reply is rendered one heading level below the message it replies to.
+    """
+    stack = [(message, heading_level)]
+    while stack:
+        current, level = stack.pop()
+        _format_message_content(parts, current, level, config=config)
+        if current.replies:
+            parts.append("\n")
+            stack.extend((reply, level + 1) for reply in reversed(current.replies))
+
+
+def _format_message_content(
+    parts: list[str], message: Message, heading_level: int, config: Config
+) -> None:
+    """Appends a single Message object, without its replies, to `parts`, including a header."""
     user = message.user or UNKNOWN_USER
 
     # TODO: use slack_text_converter._format_user_mention for this
     bot_prefix = "bot: " if user.is_bot else ""
-    user_display = f"@{user.name} ({bot_prefix}{user.real_name})"
+    heading_prefix = _HEADING_PREFIXES[min(heading_level, _MAX_HEADING_LEVEL)]
 
-    header = f"{'#' * heading_level} {user_display} {message.ts_display}"
-    output = f"{header}\n\n{message.markdown}\n\n"
+    parts.append(
+        f"{heading_prefix} @{user.name} ({bot_prefix}{user.real_name}) {message.ts_display}\n\n"
+        f"{message.markdown}\n\n"
+    )
 
     # Attachments (Slack's legacy method)
     for attachment in message.attachments:
-        output += format_attachment(
-            attachment, heading_level=heading_level + 1, config=config
+        format_attachment(
+            parts, attachment, heading_level=heading_level + 1, config=config
         )
 
     # Files
     for file in message.files:
-        output += format_file(file, heading_level=heading_level + 1, config=config)
+        format_file(parts, file, heading_level=heading_level + 1, config=config)
 
     # Reactions
     if message.reactions:
-        reactions_line = "Reactions: "
-        reactions_line += ", ".join(f"{r.name} ({r.count})" for r in message.reactions)
-        output += reactions_line + "\n\n"
-
-    if message.replies:
-        output += "\n"
-        output += format_replies(
-            message.replies, level=heading_level + 1, config=config
+        parts.append(
+            _format_reactions(tuple((r.name, r.count) for r in message.reactions))
         )
-    return output
 
 
-def format_replies(replies: list[Message], level: int, config: Config) -> str:
-    """Recursively formats replies at the specified heading level."""
-    output = ""
-    for reply in replies:
-        output += format_message(reply, level, config=config)
-        if reply.replies:
-            output += "\n"
-            output += format_replies(reply.replies, level=level + 1, config=config)
+@lru_cache(maxsize=1024)
+def _format_reactions(reactions: tuple[tuple[str, int], ...]) -> str:
+    """Formats (name, count) reaction pairs as a Reactions paragraph.
 
-    return output
+    Many messages carry identical reaction sets, so the result is cached by those pairs.
+    """
+    reaction_list = ", ".join(f"{name} ({count})" for name, count in reactions)
+    return f"Reactions: {reaction_list}\n\n"
 
 
 def format_attachment(
-    attachment: Attachment, heading_level: int, config: Config
-) -> str:
-    """Formats an Attachment object into human-readable Markdown, treating it as a subsection.
+    parts: list[str], attachment: Attachment, heading_level: int, config: Config
+) -> None:
+    """Appends an Attachment object to `parts` as human-readable Markdown, treating it as a subsection.
 
     Args:
+        parts: The list of output strings to append to.
         attachment: The Attachment object to format.
         heading_level: The Markdown heading level for the attachment title (default is 4).
     """
-    heading_prefix = "#" * heading_level
-    output = f"{heading_prefix} Attachment\n\n"
+    heading_prefix = _HEADING_PREFIXES[min(heading_level, _MAX_HEADING_LEVEL)]
+    parts.append(f"{heading_prefix} Attachment\n\n")
 
     if attachment.pretext:
-        output += f"{attachment.pretext}\n\n"
+        parts.append(f"{attachment.pretext}\n\n")
     if attachment.title:
         title_link = (
             f"[{attachment.title}]({attachment.title_link})"
             if attachment.title_link
             else attachment.title
         )
-        output += f"* **{title_link}**\n\n"
+        parts.append(f"* **{title_link}**\n\n")
     if attachment.author_name:
-        output += f"* Author: {attachment.author_name}\n\n"
+        parts.append(f"* Author: {attachment.author_name}\n\n")
     if attachment.markdown:
-        output += f"{attachment.markdown}\n\n"
+        parts.append(f"{attachment.markdown}\n\n")
     if attachment.footer:
-        output += f"* Footer: {attachment.footer}\n\n"  # Use bullet for Footer
+        parts.append(f"* Footer: {attachment.footer}\n\n")  # Use bullet for Footer
     if config.images and attachment.image_url:
-        output += f"![image]({attachment.image_url})\n\n"
-
-    return output
+        parts.append(f"![image]({attachment.image_url})\n\n")
 
 
-def format_file(file: File, heading_level: int, config: Config) -> str:
-    heading_prefix = "#" * heading_level
+def format_file(
+    parts: list[str], file: File, heading_level: int, config: Config
+) -> None:
+    heading_prefix = _HEADING_PREFIXES[min(heading_level, _MAX_HEADING_LEVEL)]
     file_name_display = file.title or file.name or ""
     file_display = (
         f"[{file_name_display}]({file.url})" if file.url else file_name_display
     )
-    output = f"{heading_prefix} File: {file_display}\n\n"
+    parts.append(f"{heading_prefix} File: {file_display}\n\n")
     if file.preview:
-        output += file.preview
-        output += "\n\n"
-    return output
+        parts.append(f"{file.preview}\n\n")
@@ -7,10 +7,19 @@
 
 import json
 import logging
+import queue
+import threading
 from pathlib import Path
+from typing import Any, Iterator, TypeVar
 
 logger = logging.getLogger(__name__)
 
+# How long the background thread waits on a full queue before checking for a stop.
+_PREFETCH_PUT_TIMEOUT_SECONDS = 0.1
+
+_T = TypeVar("_T")
+_END_OF_ITEMS = object()
+
 
 def read_array_from_json_file(filepath: Path, quiet=False) -> list:
     """reads a json file and returns its contents as array"""
@@ -37,3 +46,47 @@ def write_array_to_json_file(arr, filepath: Path) -> None:
             json.dump(arr, file, sort_keys=True, indent=4, ensure_ascii=False)
     except IOError:
         logger.error("failed to write to %s", my_file, exc_info=True)
+
+
+def iter_in_background(items: Iterator[_T], max_prefetched: int) -> Iterator[_T]:
+    """Yields the items of an iterator that is consumed by a background thread.
+
+    The background thread may get up to max_prefetched items ahead of the caller, so it
+    can wait on the network for the next item while the caller works on the current one.
+    An exception raised by the iterator is re-raised in the caller. If the caller stops
+    early, the background thread stops too instead of waiting on the full queue forever.
+    """
+    prefetched: queue.Queue = queue.Queue(maxsize=max_prefetched)
+    stop = threading.Event()
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                prefetched.put(item, timeout=_PREFETCH_PUT_TIMEOUT_SECONDS)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put(item):
+                    return
+            put(_END_OF_ITEMS)
+        except BaseException as e:
+            put(e)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = prefetched.get()
+            if item is _END_OF_ITEMS:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+        producer.join()
+    finally:
+        stop.set()
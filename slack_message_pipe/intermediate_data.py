@@ -10,7 +10,7 @@ from dataclasses import dataclass, field
 from typing import Optional, Union
 
 
-@dataclass
+@dataclass(slots=True)
 class User:
     """Represents a Slack user with a unique identifier and display name."""
 
@@ -19,11 +19,34 @@ class User:
     real_name: str
     is_bot: bool
 
+    @classmethod
+    def get_or_create(
+        cls, user_id: str, name: str, real_name: str, is_bot: bool
+    ) -> "User":
+        """Returns a shared User for these values, creating it on first use.
+
+        A user typically authors many messages in a channel history, so interning by id
+        lets all of those messages share a single User instance. Callers must therefore
+        not mutate the returned object.
+        """
+        user = _users_by_id.get(user_id)
+        if (
+            user is None
+            or user.name != name
+            or user.real_name != real_name
+            or user.is_bot != is_bot
+        ):
+            user = cls(id=user_id, name=name, real_name=real_name, is_bot=is_bot)
+            _users_by_id[user_id] = user
+        return user
+
+
+_users_by_id: dict[str, User] = {}
 
 UNKNOWN_USER = User(id="no-id", name="unknown", real_name="Unknown User", is_bot=False)
 
 
-@dataclass
+@dataclass(slots=True)
 class Channel:
     """Represents a Slack channel with a unique identifier and name."""
 
@@ -31,7 +54,7 @@ class Channel:
     name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Reaction:
     """Represents a reaction to a Slack message, including the emoji used and the user IDs who reacted."""
 
@@ -40,7 +63,7 @@ class Reaction:
     user_ids: list[str]
 
 
-@dataclass
+@dataclass(slots=True)
 class File:
     """Represents a file shared in a Slack message, with metadata and optional preview."""
 
@@ -55,7 +78,7 @@ class File:
     timestamp: Optional[datetime.datetime] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Composition:
     """Represents a composition object in Slack's Block Kit."""
 
@@ -64,49 +87,49 @@ class Composition:
     emoji: Optional[bool] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Element:
     """Represents a block element within Slack's Block Kit."""
 
     type: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Block:
     """Represents a layout block within Slack's Block Kit."""
 
     type: str
 
 
-@dataclass
+@dataclass(slots=True)
 class SectionBlock(Block):
     """Represents a section block."""
 
     text: Optional[Composition] = None
-    fields: Optional[list[Composition]] = None
+    fields: tuple[Composition, ...] = ()
     accessory: Optional[Element] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ActionsBlock(Block):
     """Represents an actions block."""
 
     elements: list[Element] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class ContextBlock(Block):
     """Represents a context block."""
 
     elements: list[Element] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class DividerBlock(Block):
     """Represents a divider block."""
 
 
-@dataclass
+@dataclass(slots=True)
 class ImageBlock(Block):
     """Represents an image block."""
 
@@ -115,7 +138,7 @@ class ImageBlock(Block):
     title: Optional[Composition] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Attachment:
     """Represents an attachment to a Slack message, which may include text, fields, and other elements."""
 
@@ -131,7 +154,7 @@ class Attachment:
     blocks: list[Block] = field(default_factory=list)  # Blocks of rich layout
 
 
-@dataclass
+@dataclass(slots=True)
 class Message:
     """Represents a Slack message, including its content, author, and any associated interactive elements."""
 
@@ -158,7 +181,7 @@ class Message:
     replies: list["Message"] = field(default_factory=list)  # Replies in a thread
 
 
-@dataclass
+@dataclass(slots=True)
 class ChannelHistory:
     """Historical messages and threads for a Slack channel."""
 
@@ -166,17 +189,7 @@ class ChannelHistory:
     top_level_messages: list[Message]
 
 
-@dataclass
-class TextStyle:
-    """Represents the style attributes of text in a rich text element."""
-
-    bold: Optional[bool] = None
-    italic: Optional[bool] = None
-    strike: Optional[bool] = None
-    code: Optional[bool] = None
-
-
-@dataclass
+@dataclass(slots=True)
 class ButtonElement(Element):
     """Represents a button element within Slack's Block Kit."""
 
@@ -186,7 +199,7 @@ class ButtonElement(Element):
     # You can add more fields specific to the button element as needed
 
 
-@dataclass
+@dataclass(slots=True)
 class ImageElement(Element):
     """Represents an image element within Slack's Block Kit."""
 
@@ -195,7 +208,7 @@ class ImageElement(Element):
     # Additional fields for image elements can be added here
 
 
-@dataclass
+@dataclass(slots=True)
 class SelectOption:
     """Represents an option within a select menu."""
 
@@ -206,7 +219,7 @@ class SelectOption:
 # Refining StaticSelectElement to use SelectOption
 
 
-@dataclass
+@dataclass(slots=True)
 class StaticSelectElement(Element):
     """Represents a static select menu element within Slack's Block Kit."""
 
@@ -215,14 +228,14 @@ class StaticSelectElement(Element):
     action_id: str
 
 
-@dataclass
+@dataclass(slots=True)
 class RichTextElement:
     """Base class for rich text elements."""
 
     type: str
 
 
-@dataclass
+@dataclass(slots=True)
 class RichTextStyle:
     """Represents the style attributes of text in a rich text element."""
 
@@ -235,7 +248,7 @@ class RichTextStyle:
     unlink: Optional[bool] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class RichTextSectionElement(RichTextElement):
     """Represents a section element within a rich text block."""
 
@@ -243,7 +256,7 @@ class RichTextSectionElement(RichTextElement):
     style: Optional[RichTextStyle] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class RichTextListElement(RichTextElement):
     """Represents a list element within a rich text block."""
 
@@ -254,7 +267,7 @@ class RichTextListElement(RichTextElement):
     border: Optional[int] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class RichTextPreformattedElement(RichTextElement):
     """Represents a preformatted text element within a rich text block."""
 
@@ -262,7 +275,7 @@ class RichTextPreformattedElement(RichTextElement):
     border: Optional[int] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class RichTextQuoteElement(RichTextElement):
     """Represents a quote element within a rich text block."""
 
@@ -270,7 +283,7 @@ class RichTextQuoteElement(RichTextElement):
     border: Optional[int] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class RichTextTextElement(RichTextElement):
     """Represents a text element within a rich text block."""
 
@@ -278,7 +291,7 @@ class RichTextTextElement(RichTextElement):
     style: Optional[RichTextStyle] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class RichTextChannelElement(RichTextElement):
     """Represents a channel mention in a rich text element."""
 
@@ -286,7 +299,7 @@ class RichTextChannelElement(RichTextElement):
     style: Optional[RichTextStyle] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class RichTextUserElement(RichTextElement):
     """Represents a user mention in a rich text element."""
 
@@ -294,7 +307,7 @@ class RichTextUserElement(RichTextElement):
     style: Optional[RichTextStyle] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class RichTextUserGroupElement(RichTextElement):
     """Represents a user group mention in a rich text element."""
 
@@ -302,14 +315,14 @@ class RichTextUserGroupElement(RichTextElement):
     style: Optional[RichTextStyle] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class RichTextEmojiElement(RichTextElement):
     """Represents an emoji in a rich text element."""
 
     emoji_name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class RichTextLinkElement(RichTextElement):
     """Represents a hyperlink in a rich text element."""
 
@@ -334,7 +347,7 @@ RichTextElementType = Union[
 ]
 
 
-@dataclass
+@dataclass(slots=True)
 class RichTextBlock(Block):
     """Represents a rich text block."""
 
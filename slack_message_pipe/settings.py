@@ -55,6 +55,10 @@ FALLBACK_LOCALE = _my_config.getstr("locale", "fallback_locale")  # type: ignore
 MAX_MESSAGES_PER_CHANNEL = _my_config.getint("slack", "max_messages_per_channel")
 MAX_MESSAGES_PER_THREAD = _my_config.getint("slack", "max_messages_per_thread")
 SLACK_PAGE_LIMIT = _my_config.getint("slack", "slack_page_limit")
+SLACK_LIST_PAGE_LIMIT = _my_config.getint("slack", "slack_list_page_limit")
+MAX_CONCURRENT_CHANNELS = _my_config.getint("slack", "max_concurrent_channels")
+SLACK_THREAD_CONCURRENCY = _my_config.getint("slack", "slack_thread_concurrency")
+NAME_CACHE_TTL_SECONDS = _my_config.getint("slack", "name_cache_ttl_seconds")
 
 
 class FormatterInfo(TypedDict):
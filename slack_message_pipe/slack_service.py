@@ -5,16 +5,31 @@
 # Copyright (c) 2019 Erik Kalkoken
 # Copyright (c) 2024 Dean Thompson
 
+import dataclasses
 import datetime
+import json
 import logging
+import os
+import ssl
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
+from itertools import chain
+from pathlib import Path
 from pprint import pformat
-from typing import Optional, TypedDict, cast
+from typing import Iterable, Iterator, Optional, TypedDict, cast
 
 import slack_sdk
 from babel.numbers import format_decimal
 from slack_sdk.errors import SlackApiError
+from slack_sdk.web import base_client as slack_base_client
+
+try:
+    import orjson
+except ImportError:  # optional dependency, see the "fast" extra
+    orjson = None
 
 from slack_message_pipe import settings
 from slack_message_pipe.locales import LocaleHelper
@@ -23,6 +38,21 @@ logger = logging.getLogger(__name__)
 
 
 MAX_SLACK_RATE_LIMIT_RETRIES = 5
+MAX_CONCURRENT_BOT_INFO_CALLS = 8
+
+# Calls per minute allowed by the Slack rate limit tier of each API method we use,
+# see https://api.slack.com/apis/rate-limits
+SLACK_METHOD_CALLS_PER_MINUTE = {
+    "conversations_history": 50,  # Tier 3
+    "conversations_replies": 50,  # Tier 3
+    "conversations_list": 20,  # Tier 2
+    "users_list": 20,  # Tier 2
+    "users_info": 100,  # Tier 4
+    "bots_info": 50,  # Tier 3
+}
+
+# Where the CLI caches workspace user, channel and usergroup names between runs.
+DEFAULT_NAME_CACHE_DIR = Path.home() / ".cache" / "slack_message_pipe"
 
 
 class ExceededMaxRetriesException(Exception):
@@ -50,7 +80,83 @@ class SlackMessage(TypedDict, total=False):
     mrkdwn: bool
 
 
-@dataclass
+class _OrjsonDecodingJson:
+    """Stands in for the json module inside slack_sdk's base client, decoding with orjson.
+
+    Everything except loads is delegated to the standard json module. Input that orjson
+    rejects but the json module accepts, such as lone surrogates or NaN, is decoded with
+    the json module, so such messages decode exactly as they did without orjson.
+    """
+
+    def __getattr__(self, name: str):
+        return getattr(json, name)
+
+    @staticmethod
+    def loads(s, *args, **kwargs):
+        try:
+            return orjson.loads(s)  # pylint: disable=no-member
+        except orjson.JSONDecodeError:  # pylint: disable=no-member
+            return json.loads(s, *args, **kwargs)
+
+
+def _use_orjson_for_slack_responses() -> None:
+    """Makes slack_sdk decode API responses with orjson, if it is installed.
+
+    Only the json reference inside slack_sdk.web.base_client is replaced, not the json module itself.
+    """
+    if orjson is not None and not isinstance(
+        slack_base_client.json, _OrjsonDecodingJson
+    ):
+        slack_base_client.json = _OrjsonDecodingJson()  # type: ignore[assignment]
+
+
+@lru_cache(maxsize=None)
+def _shared_ssl_context() -> ssl.SSLContext:
+    """Returns one SSL context for all Slack API calls.
+
+    slack_sdk opens a new HTTPS connection for every call. Without an explicit context,
+    each of those connections builds a fresh default context and reloads the CA certificates.
+    """
+    return ssl.create_default_context()
+
+
+class _TokenBucket:
+    """Thread-safe token bucket allowing calls_per_minute calls per minute on average.
+
+    Bursts of up to calls_per_minute calls go through without waiting, as Slack allows.
+    """
+
+    def __init__(self, calls_per_minute: int) -> None:
+        self._capacity = float(calls_per_minute)
+        self._tokens = self._capacity
+        self._refill_per_second = calls_per_minute / 60
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take a token, sleeping until it is available. Returns the seconds slept."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self._capacity,
+                self._tokens + (now - self._last_refill) * self._refill_per_second,
+            )
+            self._last_refill = now
+            # Taking the token even if it goes negative reserves this caller's turn,
+            # so concurrent callers are spaced out instead of all waking up at once.
+            self._tokens -= 1
+            wait_time = max(0.0, -self._tokens / self._refill_per_second)
+        if wait_time:
+            time.sleep(wait_time)
+        return wait_time
+
+
+def _to_slack_ts(when: Optional[datetime.datetime]) -> Optional[str]:
+    """Returns the Slack API timestamp string for a datetime, or None."""
+    return str(when.timestamp()) if when else None
+
+
+@dataclass(slots=True)
 class SlackUser:
     id: str
     name: str
@@ -62,7 +168,11 @@ class SlackService:
     """Service layer between main app and Slack API"""
 
     def __init__(
-        self, slack_token: str, locale_helper: Optional[LocaleHelper] = None
+        self,
+        slack_token: str,
+        locale_helper: Optional[LocaleHelper] = None,
+        name_cache_dir: Optional[Path] = None,
+        refresh_name_cache: bool = False,
     ) -> None:
         """
         Initialize SlackService with a Slack token and an optional locale helper.
@@ -70,21 +180,42 @@ class SlackService:
         Args:
             slack_token: Slack token to use for all API calls.
             locale_helper: Locale helper instance for localization.
+            name_cache_dir: If given, the workspace's user, channel and usergroup names
+                are cached in this directory for settings.NAME_CACHE_TTL_SECONDS between runs.
+            refresh_name_cache: Fetch the names from Slack even if the cache is fresh.
         """
         if slack_token is None:
             raise ValueError("slack_token can not be null")
 
-        self._client = slack_sdk.WebClient(token=slack_token)
+        _use_orjson_for_slack_responses()
+        self._client = slack_sdk.WebClient(token=slack_token, ssl=_shared_ssl_context())
         self._api_calls_since_last_rate_limit_error = 0
+        self._rate_limiters = {
+            method: _TokenBucket(calls_per_minute)
+            for method, calls_per_minute in SLACK_METHOD_CALLS_PER_MINUTE.items()
+        }
+        self._bot_names_from_api: dict[str, str] = {}
         if not locale_helper:
             locale_helper = LocaleHelper()
         self._locale = locale_helper.locale
         self._workspace_info = self._fetch_workspace_info()
         logger.info("Current Slack workspace: %s", self.team)
-        self._user_data = self.fetch_user_data()
 
-        self._channel_names = self._fetch_channel_names()
-        self._usergroup_names = self._fetch_usergroup_names()
+        name_cache_path = self._name_cache_path(name_cache_dir)
+        if not (
+            name_cache_path
+            and not refresh_name_cache
+            and self._load_name_cache(name_cache_path)
+        ):
+            # Users and channels are separate paginated listings, so page through both at once.
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                user_data_future = executor.submit(self.fetch_user_data)
+                channel_names_future = executor.submit(self._fetch_channel_names)
+                self._user_data = user_data_future.result()
+                self._channel_names = channel_names_future.result()
+            self._usergroup_names = self._fetch_usergroup_names()
+            if name_cache_path:
+                self._save_name_cache(name_cache_path)
 
     @property
     def team(self) -> str:
@@ -103,6 +234,58 @@ class SlackService:
         """Return usergroup names."""
         return self._usergroup_names
 
+    def _name_cache_path(self, name_cache_dir: Optional[Path]) -> Optional[Path]:
+        """Return the name cache file for this workspace, or None if names are not cached."""
+        team_id = self._workspace_info.get("team_id")
+        if not name_cache_dir or not team_id:
+            return None
+        return name_cache_dir / f"{team_id}.json"
+
+    def _load_name_cache(self, path: Path) -> bool:
+        """Load the workspace's names from the cache file if it is fresh.
+
+        Returns whether the names were loaded.
+        """
+        try:
+            if time.time() - path.stat().st_mtime > settings.NAME_CACHE_TTL_SECONDS:
+                return False
+            with path.open("r", encoding="utf-8") as f:
+                cached = json.load(f)
+            self._user_data = {
+                user_id: SlackUser(**user) for user_id, user in cached["users"].items()
+            }
+            self._channel_names = cached["channels"]
+            self._usergroup_names = cached["usergroups"]
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError, TypeError):
+            logger.warning("Ignoring unreadable name cache %s", path, exc_info=True)
+            return False
+        logger.info("Loaded user, channel and usergroup names from %s", path)
+        return True
+
+    def _save_name_cache(self, path: Path) -> None:
+        """Write the workspace's names to the cache file."""
+        cached = {
+            "users": {
+                user_id: dataclasses.asdict(user)
+                for user_id, user in self._user_data.items()
+            },
+            "channels": self._channel_names,
+            "usergroups": self._usergroup_names,
+        }
+        # Write to a temporary file first, so that a concurrent run never reads a partial cache.
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            # The cache holds every member's name, so keep it private to the user.
+            path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(cached, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.warning("Failed to write name cache %s", path, exc_info=True)
+
     def _fetch_workspace_info(self) -> dict:
         """Fetch and return information about the current workspace."""
         logger.info("Fetching workspace info from Slack...")
@@ -121,19 +304,21 @@ class SlackService:
 
     def fetch_user_data(self) -> dict[str, SlackUser]:
         """Fetch and return a dictionary mapping user IDs to SlackUser instances."""
-        user_data_raw = self._fetch_pages(
-            "users_list", key="members", items_name="users"
+        users = self._iter_pages(
+            "users_list",
+            key="members",
+            limit=settings.SLACK_LIST_PAGE_LIMIT,
+            items_name="users",
         )
-        user_data = {}
-        for user in user_data_raw:
-            slack_user = SlackUser(
+        return {
+            user["id"]: SlackUser(
                 id=user["id"],
                 name=user["name"],
                 real_name=user.get("real_name", ""),  # Using .get() for safety
                 is_bot=user.get("is_bot", False),  # Defaulting to False if absent
             )
-            user_data[user["id"]] = slack_user
-        return user_data
+            for user in users
+        }
 
     def _fetch_user_info(self, user_id: str) -> dict:
         """Fetch and return information for a given user ID, including locale."""
@@ -145,18 +330,14 @@ class SlackService:
 
     def _fetch_channel_names(self) -> dict[str, str]:
         """Fetch and return a dictionary mapping channel IDs to channel names."""
-        channel_names_raw = self._fetch_pages(
+        channels = self._iter_pages(
             "conversations_list",
             key="channels",
             args={"types": "public_channel"},
+            limit=settings.SLACK_LIST_PAGE_LIMIT,
             items_name="channels",
         )
-        return {
-            channel: name
-            for channel, name in self._reduce_to_dict(
-                channel_names_raw, "id", "name"
-            ).items()
-        }
+        return self._reduce_to_dict(channels, "id", "name")
 
     def _fetch_usergroup_names(self) -> dict[str, str]:
         """
@@ -183,9 +364,35 @@ class SlackService:
         latest: Optional[datetime.datetime] = None,
     ) -> list[SlackMessage]:
         """Fetch and return messages from a Slack channel."""
-        oldest_ts = str(oldest.timestamp()) if oldest else None
-        latest_ts = str(latest.timestamp()) if latest else None
-        messages = self._fetch_pages(
+        return list(
+            self.iter_messages_from_channel(channel_id, max_messages, oldest, latest)
+        )
+
+    def iter_messages_from_channel(
+        self,
+        channel_id: str,
+        max_messages: Optional[int] = None,
+        oldest: Optional[datetime.datetime] = None,
+        latest: Optional[datetime.datetime] = None,
+    ) -> Iterator[SlackMessage]:
+        """Yield messages from a Slack channel, newest first, fetching pages as needed."""
+        return chain.from_iterable(
+            self.iter_message_pages_from_channel(
+                channel_id, max_messages, oldest, latest
+            )
+        )
+
+    def iter_message_pages_from_channel(
+        self,
+        channel_id: str,
+        max_messages: Optional[int] = None,
+        oldest: Optional[datetime.datetime] = None,
+        latest: Optional[datetime.datetime] = None,
+    ) -> Iterator[list[SlackMessage]]:
+        """Yield the pages of messages from a Slack channel, newest first, as each arrives."""
+        oldest_ts = _to_slack_ts(oldest)
+        latest_ts = _to_slack_ts(latest)
+        pages = self._iter_page_lists(
             "conversations_history",
             key="messages",
             args={
@@ -197,7 +404,7 @@ class SlackService:
             items_name="messages",
             collection_name="channel",
         )
-        return messages  # type: ignore
+        return pages  # type: ignore
 
     def fetch_threads_by_ts(
         self,
@@ -211,15 +418,44 @@ class SlackService:
         Fetch and return threads from messages for a channel.
         Returns a dict of thread_ts: messages, where the messages are in chronological order.
         """
+        thread_ts_list = [
+            msg["ts"]
+            for msg in top_level_slack_messages
+            if msg.get("thread_ts") == msg["ts"]
+        ]
+        return self.fetch_threads(
+            channel_id, thread_ts_list, max_thread_messages, oldest, latest
+        )
+
+    def fetch_threads(
+        self,
+        channel_id: str,
+        thread_ts_list: list[str],
+        max_thread_messages: Optional[int] = None,
+        oldest: Optional[datetime.datetime] = None,
+        latest: Optional[datetime.datetime] = None,
+    ) -> dict[str, list[SlackMessage]]:
+        """
+        Fetch and return the threads with the given parent timestamps in a channel.
+        Returns a dict of thread_ts: messages, where the messages are in chronological order.
+        """
         max_thread_messages = max_thread_messages or settings.MAX_MESSAGES_PER_THREAD
-        threads = {}
-        for msg in top_level_slack_messages:
-            if "thread_ts" in msg and msg["thread_ts"] == msg["ts"]:
-                thread_ts = msg["thread_ts"]
-                thread_messages = self._fetch_messages_from_thread(
-                    channel_id, thread_ts, max_thread_messages, oldest, latest
-                )
-                threads[thread_ts] = thread_messages
+        # Converted once here rather than for every thread.
+        oldest_ts = _to_slack_ts(oldest)
+        latest_ts = _to_slack_ts(latest)
+
+        # Each thread is a separate paginated API call, so fetch several at once.
+        # Rate limit errors are retried per call by _execute_with_rate_limit_handling.
+        with ThreadPoolExecutor(
+            max_workers=settings.SLACK_THREAD_CONCURRENCY
+        ) as executor:
+            thread_messages_list = executor.map(
+                lambda thread_ts: self._fetch_messages_from_thread(
+                    channel_id, thread_ts, max_thread_messages, oldest_ts, latest_ts
+                ),
+                thread_ts_list,
+            )
+            threads = dict(zip(thread_ts_list, thread_messages_list))
 
         return threads
 
@@ -228,12 +464,13 @@ class SlackService:
         channel_id: str,
         thread_ts: str,
         max_messages: int,
-        oldest: Optional[datetime.datetime] = None,
-        latest: Optional[datetime.datetime] = None,
+        oldest_ts: Optional[str] = None,
+        latest_ts: Optional[str] = None,
     ) -> list[SlackMessage]:
-        """Fetch and return messages from a Slack thread."""
-        oldest_ts = str(oldest.timestamp()) if oldest else None
-        latest_ts = str(latest.timestamp()) if latest else None
+        """Fetch and return messages from a Slack thread.
+
+        oldest_ts and latest_ts are Slack timestamp strings, as made by _to_slack_ts.
+        """
         messages = self._fetch_pages(
             "conversations_replies",
             key="messages",
@@ -261,6 +498,62 @@ class SlackService:
         print_result: bool = True,
     ) -> list[dict]:
         """Helper function for retrieving all pages from an API endpoint."""
+        return list(
+            self._iter_pages(
+                method,
+                key,
+                args=args,
+                limit=limit,
+                max_rows=max_rows,
+                items_name=items_name,
+                collection_name=collection_name,
+                print_result=print_result,
+            )
+        )
+
+    def _iter_pages(
+        self,
+        method: str,
+        key: str,
+        args: Optional[dict] = None,
+        limit: Optional[int] = None,
+        max_rows: Optional[int] = None,
+        items_name: Optional[str] = None,
+        collection_name: Optional[str] = None,
+        print_result: bool = True,
+    ) -> Iterator[dict]:
+        """Generator version of _fetch_pages that yields rows as each page arrives.
+
+        The next page is only requested once the rows of the current page have been consumed.
+        """
+        return chain.from_iterable(
+            self._iter_page_lists(
+                method,
+                key,
+                args=args,
+                limit=limit,
+                max_rows=max_rows,
+                items_name=items_name,
+                collection_name=collection_name,
+                print_result=print_result,
+            )
+        )
+
+    def _iter_page_lists(
+        self,
+        method: str,
+        key: str,
+        args: Optional[dict] = None,
+        limit: Optional[int] = None,
+        max_rows: Optional[int] = None,
+        items_name: Optional[str] = None,
+        collection_name: Optional[str] = None,
+        print_result: bool = True,
+    ) -> Iterator[list[dict]]:
+        """Like _iter_pages, but yields the rows of each page as one list.
+
+        The next page is only requested once the current page has been consumed.
+        """
         page = 1
         output_str = (
             f"Fetching {items_name if items_name else method} "
@@ -273,10 +566,11 @@ class SlackService:
         response = self._execute_with_rate_limit_handling(
             getattr(self._client, method), **base_args
         )
-        rows = response[key]
+        row_count = len(response[key])
+        yield response[key]
 
         while (
-            (not max_rows or len(rows) < max_rows)
+            (not max_rows or row_count < max_rows)
             and response.get("response_metadata")
             and response["response_metadata"].get("next_cursor")
         ):
@@ -289,15 +583,15 @@ class SlackService:
             response = self._execute_with_rate_limit_handling(
                 getattr(self._client, method), **page_args
             )
-            rows += response[key]
+            row_count += len(response[key])
+            yield response[key]
 
         if print_result:
             logger.info(
                 "Received %s %s",
-                format_decimal(len(rows), locale=self._locale),
+                format_decimal(row_count, locale=self._locale),
                 items_name if items_name else "objects",
             )
-        return rows
 
     def fetch_bot_names_for_messages(
         self, messages: list[SlackMessage], threads: dict[str, list[SlackMessage]]
@@ -307,45 +601,47 @@ class SlackService:
         Will only fetch names for bots that never appeared with a username
         in any message (lazy approach since calls to bots_info are very slow)
         """
-        # collect bot_ids without user name from messages
-        bot_ids = []
         bot_names = {}
-        for msg in messages:
+        bot_ids_without_username = set()
+        for msg in chain(messages, *threads.values()):
             if "bot_id" in msg:
                 bot_id = msg["bot_id"]
                 username_from_message = msg.get("username")
                 if username_from_message:
                     bot_names[bot_id] = username_from_message
                 else:
-                    bot_ids.append(bot_id)
-
-        # collect bot_ids without user name from thread messages
-        for thread_messages in threads.values():
-            for msg in thread_messages:
-                if "bot_id" in msg:
-                    username_from_message = msg.get("username")
-                    if username_from_message:
-                        bot_names[bot_id] = username_from_message
-                    else:
-                        bot_ids.append(bot_id)
+                    bot_ids_without_username.add(bot_id)
 
-        # Find bot IDs that are not in bot_names
-        bot_ids = list(set(bot_ids).difference(bot_names.keys()))
+        # Find bot IDs that are not in bot_names and were not looked up before
+        bot_ids = []
+        for bot_id in bot_ids_without_username.difference(bot_names):
+            if bot_id in self._bot_names_from_api:
+                bot_names[bot_id] = self._bot_names_from_api[bot_id]
+            else:
+                bot_ids.append(bot_id)
 
         # collect bot names from API if needed
         if len(bot_ids) > 0:
             logger.info("Fetching names for %d bots", len(bot_ids))
-            for bot_id in bot_ids:
-                response = self._execute_with_rate_limit_handling(
-                    self._client.bots_info, bot=bot_id
+            # Each bots_info call is a slow round trip, so make several at once.
+            with ThreadPoolExecutor(
+                max_workers=MAX_CONCURRENT_BOT_INFO_CALLS
+            ) as executor:
+                responses = executor.map(
+                    lambda bot_id: self._execute_with_rate_limit_handling(
+                        self._client.bots_info, bot=bot_id
+                    ),
+                    bot_ids,
                 )
-                if response["ok"]:
-                    bot_names[bot_id] = response["bot"]["name"]
+                for bot_id, response in zip(bot_ids, responses):
+                    if response["ok"]:
+                        bot_names[bot_id] = response["bot"]["name"]
+                        self._bot_names_from_api[bot_id] = bot_names[bot_id]
         return bot_names
 
     @staticmethod
     def _reduce_to_dict(
-        arr: list[dict],
+        arr: Iterable[dict],
         key_name: str,
         col_name_primary: str,
         col_name_secondary: Optional[str] = None,
@@ -353,7 +649,7 @@ class SlackService:
         """returns dict with selected columns as key and value from list of dict
 
         Args:
-            arr: list of dicts to reduce
+            arr: dicts to reduce, e.g. rows streamed by _iter_pages
             key_name: name of column to become key
             col_name_primary: colum will become value if it exists
             col_name_secondary: colum will become value if col_name_primary
@@ -363,18 +659,31 @@ class SlackService:
         col_name_secondary will not be included in the resulting new dict
 
         """
-        result = {}
-        for item in arr:
-            if key_name in item:
-                key = item[key_name]
-                if col_name_primary in item:
-                    result[key] = item[col_name_primary]
-                elif col_name_secondary and col_name_secondary in item:
-                    result[key] = item[col_name_secondary]
-        return result
+        return {
+            item[key_name]: (
+                item[col_name_primary]
+                if col_name_primary in item
+                else item[col_name_secondary]  # type: ignore[index]
+            )
+            for item in arr
+            if key_name in item
+            and (
+                col_name_primary in item
+                or (col_name_secondary and col_name_secondary in item)
+            )
+        }
 
     def _execute_with_rate_limit_handling(self, api_call, *args, **kwargs):
+        rate_limiter = self._rate_limiters.get(getattr(api_call, "__name__", ""))
         for attempt in range(MAX_SLACK_RATE_LIMIT_RETRIES):
+            if rate_limiter:
+                wait_time = rate_limiter.acquire()
+                if wait_time:
+                    logger.debug(
+                        "Waited %.1f seconds to stay within the rate limit of %s",
+                        wait_time,
+                        api_call.__name__,
+                    )
             try:
                 result = api_call(*args, **kwargs)
                 if attempt > 0:
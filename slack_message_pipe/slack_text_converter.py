@@ -7,6 +7,7 @@
 
 import logging
 import re
+from typing import Callable
 
 from slack_message_pipe.intermediate_data import UNKNOWN_USER
 from slack_message_pipe.locales import LocaleHelper
@@ -14,6 +15,27 @@ from slack_message_pipe.slack_service import SlackService
 
 logger = logging.getLogger(__name__)
 
+# A negated character class matches the same spans as r"<(.*?)>" without backtracking.
+_ANGLE_BRACKETS_RE = re.compile(r"<([^>\n]*)>")
+
+# All of Slack's markup that needs converting, matched in a single pass:
+# - blockquote: the ">" that starts a non-empty line
+# - token: a <...> mention, channel reference or link
+# - bold: *text*, where text steps over whole <...> tokens, so an asterisk
+#   inside a token never closes the bold text
+_SLACK_MARKUP_RE = re.compile(
+    r"(?P<blockquote>^>(?=.))"
+    r"|<(?P<token>[^>\n]*)>"
+    r"|\*(?P<bold>(?:<[^>\n]*>|<(?![^>\n]*>)|[^<\n])+?)\*",
+    flags=re.MULTILINE,
+)
+
+_BROADCAST_MENTIONS = {
+    "!here": "@here",
+    "!channel": "@channel",
+    "!everyone": "@everyone",
+}
+
 
 class SlackTextConverter:
     """A class for parsing and transforming Slack text into standard markdown."""
@@ -25,6 +47,25 @@ class SlackTextConverter:
     ) -> None:
         self._slack_service = slack_service
         self._locale_helper = locale_helper
+        # User and channel mentions are recognized by their first two characters.
+        self._mention_formatters: dict[str, Callable[[str], str]] = {
+            "@U": self._format_user_mention,
+            "@W": self._format_user_mention,
+            "#C": self._format_channel_mention,
+        }
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Picks up the Slack service's current names and forgets converted tokens.
+
+        The names are snapshotted because SlackService fetches them once, at construction;
+        a long-running process that replaces the service's names should call this afterwards.
+        """
+        self._user_data = self._slack_service.user_data()
+        self._usergroup_names = self._slack_service.usergroup_names()
+        # The same mentions and links recur throughout a channel's history,
+        # so remember what each <...> token converted to.
+        self._token_cache: dict[str, str] = {}
 
     def convert_slack_text(self, text: str, is_markdown: bool) -> str:
         """Convert Slack-specific markdown into standard markdown if is_markdown, else return text unchanged.
@@ -36,40 +77,49 @@ class SlackTextConverter:
         Returns:
             The converted text.
         """
-        result = text
         if not is_markdown:
-            return result
-
-        # Transform Slack-specific markdown with brackets
-        result = re.sub(r"<(.*?)>", self._replace_markdown_in_text, result)
-
-        # Transform other Slack-specific markdown elements
-        # Bold
-        result = re.sub(r"\*(.+?)\*", r"**\1**", result)
-        # Italic
-        result = re.sub(r"\b_(.+?)_\b", r"_\1_", result)
-        # Code
-        result = re.sub(r"`(.+?)`", r"`\1`", result)
-        # Blockquotes
-        result = re.sub(r"^>(.+)", r"> \1", result, flags=re.MULTILINE)
-        # Newlines are already markdown compatible
-
-        return result
+            return text
+        # Most messages are plain text without any of the characters that start
+        # Slack markup, and a few substring scans are much cheaper than a regex pass.
+        if "<" not in text and "*" not in text and ">" not in text:
+            return text
+
+        # Italic (_text_), code (`text`) and newlines are already markdown compatible
+        return _SLACK_MARKUP_RE.sub(self._replace_slack_markup, text)
+
+    def _replace_slack_markup(self, match_obj: re.Match) -> str:
+        """Returns replacement string for re.sub with _SLACK_MARKUP_RE."""
+        kind = match_obj.lastgroup
+        if kind == "token":
+            return self._replace_token(match_obj.group("token"))
+        elif kind == "bold":
+            bold_text = _ANGLE_BRACKETS_RE.sub(
+                self._replace_markdown_in_text, match_obj.group("bold")
+            )
+            return f"**{bold_text}**"
+        else:
+            return "> "
 
     def _replace_markdown_in_text(self, match_obj: re.Match) -> str:
         """Returns replacement string for re.sub to resolve Slack-specific markdown."""
-        match = match_obj.group(1)
-
-        if match.startswith("@U") or match.startswith("@W"):
-            return self._format_user_mention(match[1:])
+        return self._replace_token(match_obj.group(1))
 
-        elif match.startswith("#C"):
-            return self._format_channel_mention(match[1:])
+    def _replace_token(self, match: str) -> str:
+        """Returns the markdown for the contents of a <...> token, converting it only once."""
+        replacement = self._token_cache.get(match)
+        if replacement is None:
+            replacement = self._token_cache[match] = self._convert_token(match)
+        return replacement
 
-        elif match.startswith("!subteam^"):
-            return self._process_user_group_id(match)
+    def _convert_token(self, match: str) -> str:
+        """Converts the contents of one <...> token to markdown."""
+        mention_formatter = self._mention_formatters.get(match[:2])
+        if mention_formatter:
+            return mention_formatter(match[1:])
 
         elif match.startswith("!"):
+            if match.startswith("!subteam^"):
+                return self._process_user_group_id(match)
             return self._process_special_mention(match)
 
         else:
@@ -77,15 +127,15 @@ class SlackTextConverter:
 
     def _format_user_mention(self, user_id: str) -> str:
         """Transforms a user ID into a markdown mention."""
-        user = self._slack_service.user_data().get(user_id, UNKNOWN_USER)
+        user = self._user_data.get(user_id, UNKNOWN_USER)
         bot_prefix = "bot: " if user.is_bot else ""
         return f"@{user.name} ({bot_prefix}{user.real_name})"
 
     def _format_channel_mention(self, mention_target: str) -> str:
         """Transforms a channel mention_target like "CQRPRM0UW|dia" into mention like #dia."""
-        pieces = mention_target.split("|")
-        if len(pieces) == 2:
-            return f"#{pieces[1]}"
+        _, separator, channel_name = mention_target.partition("|")
+        if separator and "|" not in channel_name:
+            return f"#{channel_name}"
         else:
             logger.warning(
                 f"{self.__class__.__name__}._format_channel_mention: unexpected mention target format '{mention_target}'"
@@ -94,22 +144,19 @@ class SlackTextConverter:
 
     def _process_user_group_id(self, usergroup_match: str) -> str:
         """Transforms a user group mention into a markdown user group name."""
-        usergroup_id = usergroup_match.split("^")[1]
-        usergroup_name = self._slack_service.usergroup_names().get(
+        usergroup_id = usergroup_match.partition("^")[2].partition("^")[0]
+        usergroup_name = self._usergroup_names.get(
             usergroup_id, "unknown_private_channel"
         )
         return f"@{usergroup_name}"
 
     def _process_special_mention(self, special_mention: str) -> str:
         """Transforms special mentions into plain text."""
-        if special_mention == "!here":
-            return "@here"
-        elif special_mention == "!channel":
-            return "@channel"
-        elif special_mention == "!everyone":
-            return "@everyone"
+        broadcast_mention = _BROADCAST_MENTIONS.get(special_mention)
+        if broadcast_mention:
+            return broadcast_mention
         elif special_mention.startswith("!date^"):
-            date_id = special_mention.split("^")[1]
+            date_id = special_mention.partition("^")[2].partition("^")[0]
             # TODO: was self._locale_helper.get_datetime_formatted_str(date_id), but what should it be?
             return date_id
         else:
@@ -117,11 +164,10 @@ class SlackTextConverter:
 
     def _process_url(self, url_match: str) -> str:
         """Transforms a URL into a markdown link."""
-        parts = url_match.split("|")
-        if len(parts) == 2:
-            url, text = parts
-            url = url.strip()
+        url, separator, text = url_match.partition("|")
+        url = url.strip()
+        if separator and "|" not in text:
             text = text.strip()
         else:
-            url = text = parts[0].strip()
+            text = url
         return f"[{text}]({url})"
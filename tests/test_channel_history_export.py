@@ -0,0 +1,169 @@
+# MIT License
+#
+# Copyright (c) 2024 Dean Thompson
+
+import unittest
+import zoneinfo
+from unittest.mock import patch
+
+from slack_message_pipe.channel_history_export import ChannelHistoryExporter
+from slack_message_pipe.intermediate_data import (
+    Composition,
+    RichTextBlock,
+    RichTextElement,
+    RichTextSectionElement,
+    RichTextStyle,
+    RichTextTextElement,
+    RichTextUserElement,
+    SectionBlock,
+)
+from slack_message_pipe.locales import LocaleHelper
+from slack_message_pipe.slack_service import SlackService
+from slack_message_pipe.slack_text_converter import SlackTextConverter
+from tests.helpers import NoSocketsTestCase, SlackClientStub
+
+MODULE_NAME = "slack_message_pipe.slack_service"
+
+
+@patch(MODULE_NAME + ".slack_sdk")
+class TestChannelHistoryExporter(NoSocketsTestCase):
+    def _make_exporter(self, mock_slack) -> ChannelHistoryExporter:
+        mock_slack.WebClient.return_value = SlackClientStub(team="T12345678")
+        locale_helper = LocaleHelper(my_tz=zoneinfo.ZoneInfo("UTC"))
+        slack_service = SlackService("TEST", locale_helper)
+        return ChannelHistoryExporter(
+            slack_service=slack_service,
+            locale_helper=locale_helper,
+            slack_text_converter=SlackTextConverter(slack_service, locale_helper),
+        )
+
+    def test_should_format_channel_history(self, mock_slack):
+        # given
+        exporter = self._make_exporter(mock_slack)
+        # when
+        result = exporter.fetch_and_format_channel_data("C72345678")
+        # then (the Slack API returns newest first; the stub's data is oldest first)
+        self.assertEqual(result.channel.name, "london")
+        self.assertEqual(
+            [message.markdown for message in result.top_level_messages],
+            ["Message 5", "Message 4", "Message 3", "Message 2", "Message 1"],
+        )
+        self.assertEqual(
+            result.top_level_messages[-1].ts_display, "2019-07-04 21:09:01 UTC"
+        )
+
+    def test_should_attach_thread_replies_to_parent(self, mock_slack):
+        # given
+        exporter = self._make_exporter(mock_slack)
+        # when
+        result = exporter.fetch_and_format_channel_data("G1234567X")
+        # then (the Slack API returns newest first; the stub's data is oldest first)
+        parent = next(
+            message
+            for message in result.top_level_messages
+            if message.ts == "1561764011.015500"
+        )
+        self.assertEqual(
+            [reply.ts for reply in parent.replies],
+            [
+                "1562171324.000100",
+                "1562171323.000100",
+                "1562171322.000100",
+                "1562171321.000100",
+            ],
+        )
+
+    def test_should_format_rich_text_block(self, mock_slack):
+        # given
+        exporter = self._make_exporter(mock_slack)
+        block = {
+            "type": "rich_text",
+            "elements": [
+                {
+                    "type": "rich_text_section",
+                    "elements": [
+                        {"type": "text", "text": "hi ", "style": {"bold": True}},
+                        {"type": "user", "user_id": "U12345678"},
+                        {"type": "mystery"},
+                    ],
+                }
+            ],
+        }
+        # when
+        result = exporter._format_block(block)
+        # then
+        self.assertEqual(
+            result,
+            RichTextBlock(
+                type="rich_text",
+                elements=[
+                    RichTextSectionElement(
+                        type="rich_text_section",
+                        elements=[
+                            RichTextTextElement(
+                                type="text",
+                                text="hi ",
+                                style=RichTextStyle(
+                                    bold=True,
+                                    italic=False,
+                                    strike=False,
+                                    code=False,
+                                    highlight=False,
+                                    client_highlight=False,
+                                    unlink=False,
+                                ),
+                            ),
+                            RichTextUserElement(type="user", user_id="U12345678"),
+                            RichTextElement(type="mystery"),
+                        ],
+                    )
+                ],
+            ),
+        )
+
+    def test_should_format_section_block_fields(self, mock_slack):
+        # given
+        exporter = self._make_exporter(mock_slack)
+        # when
+        with_fields = exporter._format_block(
+            {"type": "section", "fields": [{"type": "mrkdwn", "text": "*a*"}]}
+        )
+        without_fields = exporter._format_block(
+            {"type": "section", "text": {"type": "mrkdwn", "text": "b"}}
+        )
+        # then
+        self.assertEqual(
+            with_fields,
+            SectionBlock(
+                type="section", fields=(Composition(type="mrkdwn", text="*a*"),)
+            ),
+        )
+        self.assertEqual(
+            without_fields,
+            SectionBlock(type="section", text=Composition(type="mrkdwn", text="b")),
+        )
+
+    def test_should_format_plain_and_rich_messages(self, mock_slack):
+        # given
+        exporter = self._make_exporter(mock_slack)
+        # when
+        plain = exporter._format_message(
+            {"ts": "1562274541.000800", "user": "U12345678", "text": "plain"}
+        )
+        rich = exporter._format_message(
+            {
+                "ts": "1562274542.000800",
+                "user": "U12345678",
+                "text": "rich",
+                "reactions": [{"name": "tada", "count": 1, "users": ["U12345678"]}],
+                "files": [],
+            }
+        )
+        # then
+        self.assertEqual(plain.markdown, "plain")
+        self.assertEqual(
+            (plain.reactions, plain.files, plain.attachments, plain.blocks),
+            ([], [], [], []),
+        )
+        self.assertEqual([reaction.name for reaction in rich.reactions], ["tada"])
+        self.assertEqual(rich.files, [])
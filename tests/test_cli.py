@@ -0,0 +1,149 @@
+# MIT License
+#
+# Copyright (c) 2024 Dean Thompson
+
+import datetime as dt
+import json
+import tempfile
+import unittest
+import zoneinfo
+from pathlib import Path
+
+from slack_message_pipe.cli import _fast_parse, _parse_datetime_argument, pretty_print
+from slack_message_pipe.intermediate_data import Channel, ChannelHistory, File, Message
+
+
+class TestFastParse(unittest.TestCase):
+    def test_should_parse_expected_formats(self):
+        expected = dt.datetime(2024, 1, 2, 3, 4)
+        self.assertEqual(_fast_parse("2024-01-02 03:04"), expected)
+        self.assertEqual(_fast_parse("2024-01-02 03:04:00"), expected)
+        self.assertEqual(_fast_parse("2024-01-02T03:04:00"), expected)
+
+    def test_should_fall_back_to_dateutil(self):
+        self.assertEqual(_fast_parse("Jan 2 2024 03:04"), dt.datetime(2024, 1, 2, 3, 4))
+
+    def test_should_raise_on_invalid_input(self):
+        with self.assertRaises(ValueError):
+            _fast_parse("not a date")
+
+
+class TestParseDatetimeArgument(unittest.TestCase):
+    def test_should_apply_process_timezone(self):
+        # given
+        tz = zoneinfo.ZoneInfo("Europe/Berlin")
+        # when
+        result = _parse_datetime_argument("2024-01-02 03:04", tz)
+        # then
+        self.assertEqual(result, dt.datetime(2024, 1, 2, 3, 4, tzinfo=tz))
+
+    def test_should_apply_named_timezone(self):
+        # when
+        result = _parse_datetime_argument(
+            "2024-01-02 03:04 Asia/Bangkok", dt.timezone.utc
+        )
+        # then
+        self.assertEqual(result.utcoffset(), dt.timedelta(hours=7))
+        self.assertEqual(result.replace(tzinfo=None), dt.datetime(2024, 1, 2, 3, 4))
+
+    def test_should_apply_utc_for_z(self):
+        # when
+        result = _parse_datetime_argument("2024-01-02 03:04 Z", None)
+        # then
+        self.assertEqual(result.utcoffset(), dt.timedelta(0))
+
+    def test_should_raise_on_invalid_datetime(self):
+        with self.assertRaises(ValueError):
+            _parse_datetime_argument("garbage", dt.timezone.utc)
+
+    def test_should_apply_timezone_abbreviation(self):
+        # when
+        result = _parse_datetime_argument("2024-01-02 03:04 EST", dt.timezone.utc)
+        # then
+        self.assertEqual(result.utcoffset(), dt.timedelta(hours=-5))
+
+    def test_should_treat_time_as_part_of_datetime(self):
+        # when
+        result = _parse_datetime_argument("2024-01-02 03:04:05", dt.timezone.utc)
+        # then
+        self.assertEqual(
+            result, dt.datetime(2024, 1, 2, 3, 4, 5, tzinfo=dt.timezone.utc)
+        )
+
+    def test_should_apply_numeric_offsets(self):
+        for offset_str, expected in [
+            ("+05:30", dt.timedelta(hours=5, minutes=30)),
+            ("-0800", dt.timedelta(hours=-8)),
+            ("+05", dt.timedelta(hours=5)),
+            ("-5", dt.timedelta(hours=-5)),
+        ]:
+            with self.subTest(offset_str=offset_str):
+                # when
+                result = _parse_datetime_argument(
+                    f"2024-01-02 03:04 {offset_str}", dt.timezone.utc
+                )
+                # then
+                self.assertEqual(result.utcoffset(), expected)
+                self.assertEqual(
+                    result.replace(tzinfo=None), dt.datetime(2024, 1, 2, 3, 4)
+                )
+
+    def test_should_raise_on_malformed_offset(self):
+        for offset_str in ["+5x", "-123456", "+"]:
+            with self.subTest(offset_str=offset_str):
+                with self.assertRaises(ValueError):
+                    _parse_datetime_argument(
+                        f"2024-01-02 03:04 {offset_str}", dt.timezone.utc
+                    )
+
+    def test_should_keep_timezone_parsed_from_datetime(self):
+        # when
+        result = _parse_datetime_argument(
+            "2024-01-02T03:04:00+05:00", zoneinfo.ZoneInfo("Asia/Tokyo")
+        )
+        # then
+        self.assertEqual(result.utcoffset(), dt.timedelta(hours=5))
+        self.assertEqual(result.replace(tzinfo=None), dt.datetime(2024, 1, 2, 3, 4))
+
+    def test_should_raise_on_out_of_range_offset(self):
+        with self.assertRaises(ValueError):
+            _parse_datetime_argument("2024-01-02 03:04 +25:00", dt.timezone.utc)
+
+
+class TestPrettyPrint(unittest.TestCase):
+    def test_should_write_channel_history_as_json(self):
+        # given
+        history = ChannelHistory(
+            channel=Channel(id="C1", name="général"),
+            top_level_messages=[
+                Message(
+                    user=None,
+                    ts="1",
+                    thread_ts=None,
+                    ts_display="1970-01-01 00:00:01 UTC",
+                    thread_ts_display=None,
+                    markdown="hi",
+                    files=[
+                        File(
+                            id="F1",
+                            url=None,
+                            name="f",
+                            filetype="text",
+                            timestamp=dt.datetime(2024, 1, 2, tzinfo=dt.timezone.utc),
+                        )
+                    ],
+                )
+            ],
+        )
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        dest_path = Path(tmp_dir.name) / "out.json"
+        # when
+        pretty_print(history, dest_path)
+        # then
+        with dest_path.open(encoding="utf-8") as f:
+            result = json.load(f)
+        self.assertEqual(result["channel"], {"id": "C1", "name": "général"})
+        message = result["top_level_messages"][0]
+        self.assertEqual(message["markdown"], "hi")
+        self.assertEqual(message["files"][0]["timestamp"], "2024-01-02 00:00:00+00:00")
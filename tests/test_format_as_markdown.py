@@ -0,0 +1,152 @@
+# MIT License
+#
+# Copyright (c) 2024 Dean Thompson
+
+import io
+import unittest
+
+from slack_message_pipe.format_as_markdown import (
+    Config,
+    format_as_markdown,
+    write_as_markdown,
+)
+from slack_message_pipe.intermediate_data import (
+    Attachment,
+    Channel,
+    ChannelHistory,
+    File,
+    Message,
+    Reaction,
+    User,
+)
+
+ALICE = User(id="U1", name="alice", real_name="Alice A", is_bot=False)
+HELPER_BOT = User(id="B1", name="helper", real_name="Helper", is_bot=True)
+
+
+def make_message(user, ts, markdown, **kwargs) -> Message:
+    return Message(
+        user=user,
+        ts=ts,
+        thread_ts=None,
+        ts_display=f"2024-01-01 00:00:0{ts} UTC",
+        thread_ts_display=None,
+        markdown=markdown,
+        **kwargs,
+    )
+
+
+def make_history() -> ChannelHistory:
+    reply = make_message(HELPER_BOT, "3", "reply")
+    anonymous_reply = make_message(None, "4", "anonymous")
+    top = make_message(
+        ALICE,
+        "1",
+        "hello",
+        reactions=[
+            Reaction(name="thumbsup", count=2, user_ids=["U1", "U2"]),
+            Reaction(name="tada", count=1, user_ids=["U1"]),
+        ],
+        files=[
+            File(
+                id="F1",
+                url="https://x/f",
+                name="f.txt",
+                filetype="text",
+                title="F",
+                preview="preview",
+            )
+        ],
+        attachments=[
+            Attachment(
+                fallback="fb",
+                markdown="att md",
+                pretext="pre",
+                title="T",
+                title_link="https://t",
+                author_name="auth",
+                footer="foot",
+                image_url="https://img",
+            )
+        ],
+        replies=[reply, anonymous_reply],
+    )
+    return ChannelHistory(
+        channel=Channel(id="C1", name="general"),
+        top_level_messages=[top, make_message(ALICE, "5", "bye")],
+    )
+
+
+EXPECTED_MARKDOWN = (
+    "# general\n\n"
+    "## @alice (Alice A) 2024-01-01 00:00:01 UTC\n\nhello\n\n"
+    "### Attachment\n\npre\n\n* **[T](https://t)**\n\n* Author: auth\n\n"
+    "att md\n\n* Footer: foot\n\n![image](https://img)\n\n"
+    "### File: [F](https://x/f)\n\npreview\n\n"
+    "Reactions: thumbsup (2), tada (1)\n\n"
+    "\n"
+    "### @helper (bot: Helper) 2024-01-01 00:00:03 UTC\n\nreply\n\n"
+    "### @unknown (Unknown User) 2024-01-01 00:00:04 UTC\n\nanonymous\n\n"
+    "## @alice (Alice A) 2024-01-01 00:00:05 UTC\n\nbye\n\n"
+)
+
+
+class TestFormatAsMarkdown(unittest.TestCase):
+    def test_should_format_channel_history(self):
+        # when
+        result = format_as_markdown(make_history(), Config(images=True))
+        # then
+        self.assertEqual(result, EXPECTED_MARKDOWN)
+
+    def test_should_omit_images_when_disabled(self):
+        # when
+        result = format_as_markdown(make_history(), Config(images=False))
+        # then
+        self.assertEqual(
+            result, EXPECTED_MARKDOWN.replace("![image](https://img)\n\n", "")
+        )
+
+    def test_should_write_same_markdown_to_stream(self):
+        # given
+        out = io.StringIO()
+        # when
+        write_as_markdown(make_history(), Config(images=True), out)
+        # then
+        self.assertEqual(out.getvalue(), EXPECTED_MARKDOWN)
+
+    def test_should_format_nested_replies_once_each(self):
+        # given
+        nested = make_message(ALICE, "3", "nested")
+        reply = make_message(HELPER_BOT, "2", "reply", replies=[nested])
+        top = make_message(ALICE, "1", "top", replies=[reply])
+        history = ChannelHistory(
+            channel=Channel(id="C1", name="general"), top_level_messages=[top]
+        )
+        # when
+        result = format_as_markdown(history, Config())
+        # then
+        self.assertEqual(
+            result,
+            "# general\n\n"
+            "## @alice (Alice A) 2024-01-01 00:00:01 UTC\n\ntop\n\n"
+            "\n"
+            "### @helper (bot: Helper) 2024-01-01 00:00:02 UTC\n\nreply\n\n"
+            "\n"
+            "#### @alice (Alice A) 2024-01-01 00:00:03 UTC\n\nnested\n\n",
+        )
+
+    def test_should_cap_heading_level_at_six(self):
+        # given
+        message = make_message(ALICE, "1", "deepest")
+        for _ in range(6):
+            message = make_message(ALICE, "1", "reply", replies=[message])
+        history = ChannelHistory(
+            channel=Channel(id="C1", name="general"), top_level_messages=[message]
+        )
+        # when
+        result = format_as_markdown(history, Config())
+        # then
+        self.assertIn(
+            "\n###### @alice (Alice A) 2024-01-01 00:00:01 UTC\n\ndeepest\n\n", result
+        )
+        self.assertNotIn("#######", result)
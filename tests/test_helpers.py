@@ -4,6 +4,8 @@
 # Copyright (c) 2024 Dean Thompson
 
 import datetime as dt
+import itertools
+import threading
 import unittest
 import zoneinfo
 from unittest.mock import patch
@@ -11,6 +13,7 @@ from unittest.mock import patch
 import babel
 from tzlocal import get_localzone
 
+from slack_message_pipe.helpers import iter_in_background
 from slack_message_pipe.locales import LocaleHelper
 
 
@@ -66,3 +69,38 @@ class TestLocaleHelper(unittest.TestCase):
         result = locale_helper.get_datetime_formatted_str(my_datetime.timestamp())
         # then
         self.assertEqual(result, "03.02.21, 18:10")
+
+
+class TestIterInBackground(unittest.TestCase):
+    def test_should_yield_all_items_in_order(self):
+        # when
+        result = list(iter_in_background(iter(range(10)), max_prefetched=1))
+        # then
+        self.assertEqual(result, list(range(10)))
+
+    def test_should_reraise_exception_from_iterator(self):
+        # given
+        def failing_items():
+            yield 1
+            raise RuntimeError("fetch failed")
+
+        # when
+        result = []
+        with self.assertRaises(RuntimeError):
+            for item in iter_in_background(failing_items(), max_prefetched=2):
+                result.append(item)
+        # then
+        self.assertEqual(result, [1])
+
+    def test_should_stop_background_thread_when_caller_stops_early(self):
+        # given
+        threads_before = set(threading.enumerate())
+        items = iter_in_background(itertools.count(), max_prefetched=1)
+        # when
+        first = next(items)
+        items.close()
+        # then
+        self.assertEqual(first, 0)
+        for thread in set(threading.enumerate()) - threads_before:
+            thread.join(timeout=5)
+            self.assertFalse(thread.is_alive())
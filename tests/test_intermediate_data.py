@@ -0,0 +1,25 @@
+# MIT License
+#
+# Copyright (c) 2024 Dean Thompson
+
+import unittest
+
+from slack_message_pipe.intermediate_data import User
+
+
+class TestUser(unittest.TestCase):
+    def test_should_share_instance_for_same_user(self):
+        # when
+        first = User.get_or_create("U_SHARED", "alice", "Alice A", False)
+        second = User.get_or_create("U_SHARED", "alice", "Alice A", False)
+        # then
+        self.assertIs(first, second)
+
+    def test_should_replace_instance_when_user_data_changes(self):
+        # given
+        first = User.get_or_create("U_CHANGED", "bob", "Bob B", False)
+        # when
+        second = User.get_or_create("U_CHANGED", "bob", "Robert B", False)
+        # then
+        self.assertIsNot(first, second)
+        self.assertEqual(second.real_name, "Robert B")
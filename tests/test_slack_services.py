@@ -3,8 +3,16 @@
 # Copyright (c) 2019 Erik Kalkoken
 # Copyright (c) 2024 Dean Thompson
 
+import json
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
 from unittest.mock import patch
 
+from slack_message_pipe import settings
+from slack_message_pipe import slack_service as slack_service_module
 from slack_message_pipe.slack_service import SlackService
 from tests.helpers import NoSocketsTestCase, SlackClientStub
 
@@ -99,6 +107,37 @@ class TestSlackService(NoSocketsTestCase):
             },
         )
 
+    def test_should_fetch_next_page_only_when_iterated(self, mock_slack):
+        # given
+        slack_stub = SlackClientStub(team="T12345678", page_size=2)
+        mock_slack.WebClient.return_value = slack_stub
+        slack_service = SlackService("TEST")
+        history_calls = []
+        conversations_history = slack_stub.conversations_history
+        slack_stub.conversations_history = lambda **kwargs: (
+            history_calls.append(kwargs) or conversations_history(**kwargs)
+        )
+        # when
+        messages = slack_service.iter_messages_from_channel("C72345678", 200)
+        first_two = [next(messages), next(messages)]
+        calls_after_first_page = len(history_calls)
+        rest = list(messages)
+        # then
+        self.assertEqual(calls_after_first_page, 1)
+        self.assertEqual(len(history_calls), 3)
+        self.assertEqual(len(first_two + rest), 5)
+
+    def test_should_yield_message_pages_as_fetched(self, mock_slack):
+        # given
+        mock_slack.WebClient.return_value = SlackClientStub(
+            team="T12345678", page_size=2
+        )
+        slack_service = SlackService("TEST")
+        # when
+        pages = list(slack_service.iter_message_pages_from_channel("C72345678", 200))
+        # then
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+
     def test_should_return_all_messages_from_conversation_2(self, mock_slack):
         # given
         mock_slack.WebClient.return_value = SlackClientStub(
@@ -145,3 +184,231 @@ class TestSlackService(NoSocketsTestCase):
                 "1562171324.000100",
             },
         )
+
+    def test_should_return_threads_for_every_thread_parent(self, mock_slack):
+        # given
+        slack_stub = SlackClientStub(team="T12345678")
+        slack_stub.conversations_replies = lambda channel, ts, **kwargs: {
+            "ok": True,
+            "messages": [
+                {"ts": ts, "thread_ts": ts},
+                {"ts": ts + "1", "thread_ts": ts},
+            ],
+        }
+        mock_slack.WebClient.return_value = slack_stub
+        slack_service = SlackService("TEST")
+        messages = [
+            {"ts": f"15617640{i}.000000", "thread_ts": f"15617640{i}.000000"}
+            for i in range(10, 20)
+        ] + [{"ts": "1561764100.000000"}]
+        # when
+        result = slack_service.fetch_threads_by_ts("G1234567X", messages, 200)
+        # then
+        self.assertEqual(list(result), [f"15617640{i}.000000" for i in range(10, 20)])
+        for thread_ts, thread_messages in result.items():
+            self.assertEqual(
+                [message["ts"] for message in thread_messages],
+                [thread_ts, thread_ts + "1"],
+            )
+
+    def test_should_fetch_names_for_bots_without_username(self, mock_slack):
+        # given
+        slack_stub = SlackClientStub(team="T12345678")
+        slack_stub.bots_info = lambda bot: {
+            "ok": bot != "B_UNKNOWN",
+            "bot": {"name": f"name of {bot}"},
+        }
+        mock_slack.WebClient.return_value = slack_stub
+        slack_service = SlackService("TEST")
+        messages = [
+            {"ts": "1", "bot_id": "B_NAMED", "username": "named bot"},
+            {"ts": "2", "bot_id": "B_1"},
+            {"ts": "3", "bot_id": "B_2"},
+            {"ts": "4", "bot_id": "B_UNKNOWN"},
+            {"ts": "5", "user": "U1"},
+        ]
+        # when
+        result = slack_service.fetch_bot_names_for_messages(messages, {})
+        # then
+        self.assertDictEqual(
+            result,
+            {"B_NAMED": "named bot", "B_1": "name of B_1", "B_2": "name of B_2"},
+        )
+
+    def test_should_fetch_names_for_bots_in_threads_once(self, mock_slack):
+        # given
+        slack_stub = SlackClientStub(team="T12345678")
+        requested_bot_ids = []
+        slack_stub.bots_info = lambda bot: (
+            requested_bot_ids.append(bot)
+            or {"ok": True, "bot": {"name": f"name of {bot}"}}
+        )
+        mock_slack.WebClient.return_value = slack_stub
+        slack_service = SlackService("TEST")
+        messages = [{"ts": "1", "bot_id": "B_1"}]
+        threads = {
+            "1": [
+                {"ts": "1", "bot_id": "B_1"},
+                {"ts": "2", "bot_id": "B_2"},
+                {"ts": "3", "bot_id": "B_NAMED", "username": "named bot"},
+            ]
+        }
+        # when
+        result = slack_service.fetch_bot_names_for_messages(messages, threads)
+        second_result = slack_service.fetch_bot_names_for_messages(messages, threads)
+        # then
+        expected = {
+            "B_1": "name of B_1",
+            "B_2": "name of B_2",
+            "B_NAMED": "named bot",
+        }
+        self.assertDictEqual(result, expected)
+        self.assertDictEqual(second_result, expected)
+        self.assertCountEqual(requested_bot_ids, ["B_1", "B_2"])
+
+
+@patch(MODULE_NAME + ".time")
+class TestTokenBucket(unittest.TestCase):
+    def test_should_allow_burst_then_space_out_calls(self, mock_time):
+        # given
+        mock_time.monotonic.return_value = 100.0
+        bucket = slack_service_module._TokenBucket(calls_per_minute=2)
+        # when
+        wait_times = [bucket.acquire() for _ in range(4)]
+        # then
+        self.assertEqual(wait_times, [0.0, 0.0, 30.0, 60.0])
+        self.assertEqual(
+            [call.args[0] for call in mock_time.sleep.call_args_list], [30.0, 60.0]
+        )
+
+    def test_should_refill_over_time(self, mock_time):
+        # given
+        mock_time.monotonic.return_value = 100.0
+        bucket = slack_service_module._TokenBucket(calls_per_minute=2)
+        bucket.acquire()
+        bucket.acquire()
+        # when
+        mock_time.monotonic.return_value = 130.0
+        wait_time = bucket.acquire()
+        # then
+        self.assertEqual(wait_time, 0.0)
+        mock_time.sleep.assert_not_called()
+
+
+@patch(MODULE_NAME + ".slack_sdk")
+class TestSlackClient(NoSocketsTestCase):
+    def test_should_share_one_ssl_context_between_clients(self, mock_slack):
+        # given
+        mock_slack.WebClient.return_value = SlackClientStub(team="T12345678")
+        # when
+        SlackService("TEST")
+        SlackService("TEST")
+        # then
+        first_call, second_call = mock_slack.WebClient.call_args_list
+        self.assertIsNotNone(first_call.kwargs["ssl"])
+        self.assertIs(first_call.kwargs["ssl"], second_call.kwargs["ssl"])
+
+
+@patch(MODULE_NAME + ".slack_sdk")
+class TestNameCache(NoSocketsTestCase):
+    def _make_slack_stub(self, mock_slack) -> SlackClientStub:
+        slack_stub = SlackClientStub(team="T12345678")
+        slack_stub._slack_data["T12345678"]["auth_test"]["team_id"] = "T12345678"
+        mock_slack.WebClient.return_value = slack_stub
+        return slack_stub
+
+    def _make_cache_dir(self) -> Path:
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        return Path(tmp_dir.name)
+
+    def test_should_reuse_cached_names(self, mock_slack):
+        # given
+        cache_dir = self._make_cache_dir()
+        self._make_slack_stub(mock_slack)
+        first_service = SlackService("TEST", name_cache_dir=cache_dir)
+        slack_stub = self._make_slack_stub(mock_slack)
+        slack_stub.users_list = None  # fails if called
+        slack_stub.conversations_list = None
+        # when
+        second_service = SlackService("TEST", name_cache_dir=cache_dir)
+        # then
+        self.assertTrue((cache_dir / "T12345678.json").is_file())
+        self.assertEqual(second_service.user_data(), first_service.user_data())
+        self.assertEqual(second_service.channel_names(), first_service.channel_names())
+
+    @unittest.skipIf(os.name != "posix", "file modes are POSIX-only")
+    def test_should_keep_cache_private_to_user(self, mock_slack):
+        # given
+        cache_dir = self._make_cache_dir() / "names"
+        self._make_slack_stub(mock_slack)
+        # when
+        SlackService("TEST", name_cache_dir=cache_dir)
+        # then
+        self.assertEqual(cache_dir.stat().st_mode & 0o777, 0o700)
+        self.assertEqual((cache_dir / "T12345678.json").stat().st_mode & 0o777, 0o600)
+
+    def test_should_refetch_names_when_refresh_is_requested(self, mock_slack):
+        # given
+        cache_dir = self._make_cache_dir()
+        self._make_slack_stub(mock_slack)
+        SlackService("TEST", name_cache_dir=cache_dir)
+        slack_stub = self._make_slack_stub(mock_slack)
+        slack_stub._slack_data["T12345678"]["users_list"]["members"][0][
+            "name"
+        ] = "renamed"
+        # when
+        slack_service = SlackService(
+            "TEST", name_cache_dir=cache_dir, refresh_name_cache=True
+        )
+        cached_service = SlackService("TEST", name_cache_dir=cache_dir)
+        # then
+        self.assertEqual(slack_service.user_data()["U12345678"].name, "renamed")
+        self.assertEqual(cached_service.user_data()["U12345678"].name, "renamed")
+        self.assertEqual(list(cache_dir.iterdir()), [cache_dir / "T12345678.json"])
+
+    def test_should_refetch_names_when_cache_is_stale(self, mock_slack):
+        # given
+        cache_dir = self._make_cache_dir()
+        cache_path = cache_dir / "T12345678.json"
+        self._make_slack_stub(mock_slack)
+        SlackService("TEST", name_cache_dir=cache_dir)
+        stale_time = time.time() - settings.NAME_CACHE_TTL_SECONDS - 1
+        os.utime(cache_path, (stale_time, stale_time))
+        self._make_slack_stub(mock_slack)
+        # when
+        slack_service = SlackService("TEST", name_cache_dir=cache_dir)
+        # then
+        self.assertIn("U12345678", slack_service.user_data())
+        self.assertGreater(cache_path.stat().st_mtime, stale_time)
+
+
+@unittest.skipIf(slack_service_module.orjson is None, "orjson is not installed")
+class TestOrjsonDecoding(unittest.TestCase):
+    def setUp(self):
+        original_json = slack_service_module.slack_base_client.json
+        self.addCleanup(
+            setattr, slack_service_module.slack_base_client, "json", original_json
+        )
+
+    def test_should_decode_slack_responses_with_orjson(self):
+        # when
+        slack_service_module._use_orjson_for_slack_responses()
+        # then
+        slack_json = slack_service_module.slack_base_client.json
+        self.assertEqual(slack_json.loads('{"ok": true, "n": 1}'), {"ok": True, "n": 1})
+        self.assertEqual(slack_json.dumps({"a": 1}), json.dumps({"a": 1}))
+        with self.assertRaises(json.decoder.JSONDecodeError):
+            slack_json.loads("not json")
+        self.assertIsNot(slack_json, json)
+
+    def test_should_fall_back_to_json_for_input_orjson_rejects(self):
+        # given
+        slack_service_module._use_orjson_for_slack_responses()
+        slack_json = slack_service_module.slack_base_client.json
+        # when
+        lone_surrogate = slack_json.loads('{"text": "\\ud800"}')
+        not_a_number = slack_json.loads('{"n": NaN}')
+        # then
+        self.assertEqual(lone_surrogate, {"text": "\ud800"})
+        self.assertNotEqual(not_a_number["n"], not_a_number["n"])
@@ -0,0 +1,89 @@
+# MIT License
+#
+# Copyright (c) 2024 Dean Thompson
+
+import zoneinfo
+from unittest.mock import patch
+
+from slack_message_pipe.locales import LocaleHelper
+from slack_message_pipe.slack_service import SlackService
+from slack_message_pipe.slack_text_converter import SlackTextConverter
+from tests.helpers import NoSocketsTestCase, SlackClientStub
+
+MODULE_NAME = "slack_message_pipe.slack_service"
+
+
+@patch(MODULE_NAME + ".slack_sdk")
+class TestSlackTextConverter(NoSocketsTestCase):
+    def _make_converter(self, mock_slack) -> SlackTextConverter:
+        mock_slack.WebClient.return_value = SlackClientStub(team="T12345678")
+        locale_helper = LocaleHelper(my_tz=zoneinfo.ZoneInfo("UTC"))
+        return SlackTextConverter(SlackService("TEST", locale_helper), locale_helper)
+
+    def test_should_convert_slack_markup(self, mock_slack):
+        # given
+        converter = self._make_converter(mock_slack)
+        cases = [
+            ("plain text", "plain text"),
+            ("hi <@U12345678>", "hi @Naoko Kobayashi ()"),
+            ("in <#C72345678|london>", "in #london"),
+            ("<!here> <!channel> <!everyone>", "@here @channel @everyone"),
+            ("<!date^1392734382^{date}|Feb 18>", "1392734382"),
+            ("<!subteam^S123|@team>", "@unknown_private_channel"),
+            ("<https://example.com|Example>", "[Example](https://example.com)"),
+            ("<https://example.com>", "[https://example.com](https://example.com)"),
+            ("<https://a|b|c>", "[https://a](https://a)"),
+            ("<#C72345678>", "#C72345678"),
+            ("<!someone>", "@!someone"),
+            ("*bold* and _italic_ and `code`", "**bold** and _italic_ and `code`"),
+            ("line\n>quoted", "line\n> quoted"),
+            (">*quoted bold* <@U12345678>", "> **quoted bold** @Naoko Kobayashi ()"),
+            ("*bold <@U12345678>*", "**bold @Naoko Kobayashi ()**"),
+            ("*a <https://x/*|y> b*", "**a [y](https://x/*) b**"),
+            ("2 * 3 < 4 * 5", "2 ** 3 < 4 ** 5"),
+            (">\n>", ">\n>"),
+            ("a < b > c", "a [b](b) c"),
+            ("<no\nclose>", "<no\nclose>"),
+        ]
+        for text, expected in cases:
+            with self.subTest(text=text):
+                # when
+                result = converter.convert_slack_text(text, is_markdown=True)
+                # then
+                self.assertEqual(result, expected)
+
+    def test_should_leave_non_markdown_text_unchanged(self, mock_slack):
+        # given
+        converter = self._make_converter(mock_slack)
+        # when
+        result = converter.convert_slack_text("*bold* <@U12345678>", is_markdown=False)
+        # then
+        self.assertEqual(result, "*bold* <@U12345678>")
+
+    def test_should_convert_repeated_token_once(self, mock_slack):
+        # given
+        converter = self._make_converter(mock_slack)
+        # when
+        with patch.object(
+            converter, "_convert_token", wraps=converter._convert_token
+        ) as convert_token:
+            result = converter.convert_slack_text(
+                "<@U12345678> and <@U12345678>", is_markdown=True
+            )
+            converter.convert_slack_text("<@U12345678>", is_markdown=True)
+        # then
+        self.assertEqual(result, "@Naoko Kobayashi () and @Naoko Kobayashi ()")
+        convert_token.assert_called_once_with("@U12345678")
+
+    def test_should_pick_up_new_names_on_refresh(self, mock_slack):
+        # given
+        converter = self._make_converter(mock_slack)
+        converter.convert_slack_text("<!subteam^S1>", is_markdown=True)
+        converter._slack_service._usergroup_names = {"S1": "admins"}
+        # when
+        before_refresh = converter.convert_slack_text("<!subteam^S1>", is_markdown=True)
+        converter.refresh()
+        after_refresh = converter.convert_slack_text("<!subteam^S1>", is_markdown=True)
+        # then
+        self.assertEqual(before_refresh, "@unknown_private_channel")
+        self.assertEqual(after_refresh, "@admins")